@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the Discord Birthday Message Reactor
+
+Starts a local stand-in for the Discord REST API, drives DiscordReactor.run()
+against it end to end and reports wall time, requests issued, bytes decoded
+and reactions per second. Nothing is sent to Discord.
+
+Usage:
+    python benchmark.py --guilds 5 --channels-per-guild 20 --messages-per-channel 300
+    python benchmark.py --mode guilds --latency-ms 50 --rate-limit-rate 0.05
+"""
+
+import argparse
+import io
+import json
+import time
+from typing import Dict
+
+from discord_birthday_reactor import (
+    CheckpointStore,
+    DiscordReactor,
+    HTTPTransport,
+    MetadataCache,
+    ReactionLedger,
+    setup_logging,
+)
+from tests.fakes import FakeDiscordAPI, FakeDiscordServer
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Run one benchmark pass and return its results"""
+    api = FakeDiscordAPI(
+        guilds=args.guilds,
+        channels_per_guild=args.channels_per_guild,
+        dm_channels=args.dms,
+        messages_per_channel=args.messages_per_channel,
+        match_rate=args.match_rate,
+        latency=args.latency_ms / 1000,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+
+    with FakeDiscordServer(api) as server:
+        reactor = DiscordReactor(
+            token="benchmark-token",
+            delay_min=0.0,
+            delay_max=0.0,
+            transport=HTTPTransport(pool_size=max(10, args.concurrency)),
+            checkpoints=CheckpointStore(),
+            ledger=ReactionLedger(),
+            metadata=MetadataCache(),
+            guild_scan_mode=args.guild_scan_mode,
+            base_url=server.base_url,
+        )
+
+        channel_links = None
+        if args.mode == "links":
+            channel_links = [
+                f"https://discord.com/channels/{guild['id']}/{channel['id']}"
+                for guild in api.guilds for channel in api.channels[guild['id']]
+            ]
+
+        # The reactor's log output is part of what is measured, but is
+        # discarded unless --verbose is given
+        listener = setup_logging(args.log_level, args.log_format, stream=None if args.verbose else io.StringIO())
+        start = time.perf_counter()
+        try:
+            reactor.run(
+                channel_links=channel_links,
+                date_filter=args.date_filter,
+                keywords=["birthday", "HBD", "sinh nhật"],
+                concurrency=args.concurrency,
+            )
+        finally:
+            listener.stop()
+            reactor.ledger.close()
+        wall_time = time.perf_counter() - start
+
+    return {
+        "wall_time_s": round(wall_time, 3),
+        "messages_available": api.total_messages,
+        "requests": sum(api.requests.values()),
+        "requests_by_route": dict(api.requests.most_common()),
+        "rate_limited_responses": api.rate_limited,
+        "bytes_decoded": api.bytes_sent,
+        "reactions_added": api.reactions,
+        "reactions_per_second": round(api.reactions / wall_time, 2) if wall_time else 0.0,
+        "requests_per_second": round(sum(api.requests.values()) / wall_time, 2) if wall_time else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DiscordReactor against a local fake Discord API")
+    parser.add_argument("--mode", choices=["links", "guilds"], default="links",
+                        help="links: scan every channel via CHANNEL_LINKS; guilds: scan all guilds and DMs")
+    parser.add_argument("--guild-scan-mode", choices=["search", "channels"], default="search")
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--channels-per-guild", type=int, default=10)
+    parser.add_argument("--dms", type=int, default=5)
+    parser.add_argument("--messages-per-channel", type=int, default=200)
+    parser.add_argument("--match-rate", type=float, default=0.02, help="Fraction of messages that should be reacted to")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency injected into every response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--date-filter", default="today")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the reactor's own output")
+    parser.add_argument("--log-level", default="INFO", help="Reactor log level (DEBUG, INFO, WARNING, quiet)")
+    parser.add_argument("--log-format", choices=["console", "json"], default="console")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 60)
+    print("Benchmark results")
+    print("=" * 60)
+    print(f"Wall time:            {results['wall_time_s']:.3f}s")
+    print(f"Messages available:   {results['messages_available']}")
+    print(f"Requests issued:      {results['requests']} ({results['requests_per_second']}/s)")
+    print(f"429 responses:        {results['rate_limited_responses']}")
+    print(f"Bytes decoded:        {results['bytes_decoded']}")
+    print(f"Reactions added:      {results['reactions_added']} ({results['reactions_per_second']}/s)")
+    print("\nRequests by route:")
+    for route, count in results["requests_by_route"].items():
+        print(f"  {count:6d}  {route}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,19 +8,1803 @@ and may result in account suspension. Use at your own risk.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 import time
 import json
 import sys
 import os
-from typing import List, Dict, Optional
-from urllib.parse import quote
+import threading
+import hashlib
+import logging
+import logging.handlers
+import atexit
+import cProfile
+import contextlib
+import copy
+import gzip
+import queue
+import random
+import asyncio
+import sqlite3
+import re
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Dict, Optional, Set, Tuple, Union
+from urllib.parse import quote, urlsplit
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+log = logging.getLogger("discord_birthday_reactor")
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_STANDARD_LOG_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Discord epoch (2015-01-01T00:00:00Z) in milliseconds, used by snowflake IDs
+DISCORD_EPOCH_MS = 1420070400000
+
+# Maximum number of messages returned per page by the messages endpoint
+MESSAGES_PAGE_SIZE = 100
+
+# REST API root, overridable to point at a local fake API (see benchmark.py)
+DEFAULT_API_BASE_URL = "https://discord.com/api/v10"
+
+# Gateway used by listen mode when the API does not report one
+DEFAULT_GATEWAY_URL = "wss://gateway.discord.gg"
+
+# Highest offset the guild search endpoint accepts, and how many times to
+# retry while a guild's search index is still being built (202 responses)
+MAX_SEARCH_OFFSET = 9975
+SEARCH_INDEX_RETRIES = 5
+
+# Guild channel types that hold messages we scan (text and announcement)
+TEXT_CHANNEL_TYPES = {0, 5}
+
+# Path segments whose following ID is a "major parameter" - Discord keeps
+# separate rate limit state per value of these, even within one bucket
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each log record as one JSON object per line (for log shippers)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_LOG_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, so the listener thread does all formatting
+
+    The stock prepare() formats each record in the calling thread and clears
+    exc_info, which would lose the traceback and the JSON "exc" field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def setup_logging(level: str = "INFO", fmt: str = "console", stream=None) -> logging.handlers.QueueListener:
+    """
+    Send the reactor's log output to stream (stdout by default) from a background thread
+
+    Log calls only put records on an unbounded queue, so a slow terminal or a
+    full pipe never blocks scanning. Messages and tracebacks are formatted in
+    the listener thread, so lines below the level cost almost nothing.
+
+    Args:
+        level: DEBUG, INFO, WARNING or ERROR ("quiet" is WARNING)
+        fmt: "console" for plain lines, "json" for JSON lines
+
+    Returns:
+        The running listener; stop() it to flush remaining records
+    """
+    level = level.strip().upper()
+    if level == "QUIET":
+        level = "WARNING"
+    if level not in ("DEBUG", "INFO", "WARNING", "ERROR"):
+        level = "INFO"
+
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JsonLinesFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+    records = queue.SimpleQueue()
+    log.handlers = [DeferredQueueHandler(records)]
+    log.setLevel(level)
+    log.propagate = False
+
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    return listener
+
+
+def datetime_to_snowflake(dt: datetime) -> int:
+    """Return the smallest snowflake ID that could have been created at `dt`"""
+    return max(0, int(dt.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22
+
+
+def snowflake_to_datetime(snowflake: int) -> datetime:
+    """Return the UTC time a snowflake ID was created at"""
+    return datetime.fromtimestamp(((snowflake >> 22) + DISCORD_EPOCH_MS) / 1000, tz=timezone.utc)
+
+
+def parse_date_window(date_filter: str, now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Convert a date filter into (lower, upper) snowflake bounds
+
+    Accepts "today", a date ("YYYY-MM-DD") or a range "start..end" where each
+    side is a date or an ISO datetime. Dates cover whole UTC days; the end of a
+    range is inclusive for dates. "today" is the UTC day of `now` (the current
+    time by default). Messages belong to the window when lower <= ID < upper.
+    Raises ValueError for unparseable input.
+    """
+    def parse_bound(value: str, end: bool) -> datetime:
+        value = value.strip()
+        if value.lower() == "today":
+            dt = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            return dt + timedelta(days=1) if end else dt
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        if end and len(value) == 10:  # Plain date: include the whole day
+            dt += timedelta(days=1)
+        return dt
+
+    if ".." in date_filter:
+        start, end = date_filter.split("..", 1)
+    else:
+        start = end = date_filter
+
+    lower = datetime_to_snowflake(parse_bound(start, end=False))
+    upper = datetime_to_snowflake(parse_bound(end, end=True))
+    if upper <= lower:
+        raise ValueError(f"Empty date window: {date_filter}")
+    return lower, upper
+
+
+def normalize_text(text: str) -> str:
+    """Casefold and NFC-normalize text so composed and decomposed forms compare equal"""
+    return unicodedata.normalize("NFC", text.casefold())
+
+
+def decode_json(response: requests.Response) -> Any:
+    """Decode a JSON response body, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+# Variation selectors only pick text vs emoji presentation: "❤️" and "❤" are
+# the same reaction, and Discord may report either spelling
+EMOJI_VARIATION_SELECTORS = {0xFE0E: None, 0xFE0F: None}
+
+# Custom emoji as written in messages (<:name:id>, <a:name:id>) or in the API (name:id)
+CUSTOM_EMOJI_PATTERN = re.compile(r"<?(?:(a)?:)?([\w~]{2,32}):(\d{15,21})>?")
+
+
+def emoji_key(name: Optional[str], emoji_id: Optional[str] = None) -> str:
+    """Identity of an emoji for comparisons: the ID of a custom emoji, or the
+    Unicode emoji without variation selectors"""
+    if emoji_id:
+        return str(emoji_id)
+    return (name or "").translate(EMOJI_VARIATION_SELECTORS)
+
+
+class Emoji:
+    """One configured reaction emoji, parsed and URL-encoded once"""
+
+    __slots__ = ("text", "name", "id", "animated", "key", "route")
+
+    def __init__(self, text: str):
+        self.text = text
+        match = CUSTOM_EMOJI_PATTERN.fullmatch(text)
+        if match:
+            self.animated = bool(match.group(1))
+            self.name = match.group(2)
+            self.id = match.group(3)
+            # Custom emojis are addressed as name:id in reaction routes
+            segment = f"{self.name}:{self.id}"
+        else:
+            self.animated = False
+            self.id = None
+            self.name = unicodedata.name(text[0], "emoji").lower().replace(" ", "_") if text else "emoji"
+            segment = text
+        self.key = emoji_key(text, self.id)
+        self.route = quote(segment)
+
+    def __repr__(self) -> str:
+        return f"Emoji({self.text!r})"
+
+
+class EmojiRegistry:
+    """Every emoji the reactor may react with, keyed by emoji_key
+
+    Built once at startup, so reaction planning works on precomputed keys and
+    route segments instead of re-encoding emojis for every message.
+    """
+
+    def __init__(self, emojis: List[str]):
+        self.by_text: Dict[str, Emoji] = {}
+        self.by_key: Dict[str, Emoji] = {}
+        for text in emojis:
+            self.get(text)
+
+    def get(self, text: str) -> Emoji:
+        """Return the registered emoji for a configured string, registering it if new"""
+        emoji = self.by_text.get(text)
+        if emoji is None:
+            emoji = Emoji(text)
+            # "❤️" and "❤" share a key; the first spelling configured wins
+            emoji = self.by_key.setdefault(emoji.key, emoji)
+            self.by_text[text] = emoji
+        return emoji
+
+    def select(self, emojis: Optional[List[str]] = None) -> Dict[str, Emoji]:
+        """Return {key: emoji} for the given emoji strings, or for every registered emoji"""
+        if emojis is None:
+            return self.by_key
+        selected = {}
+        for text in emojis:
+            emoji = self.get(text)
+            selected[emoji.key] = emoji
+        return selected
+
+
+class MessageRecord:
+    """The fields of a Discord message the reactor uses, and nothing else
+
+    API payloads carry embeds, attachments, author objects and more; projecting
+    them onto this slotted record as soon as a page is decoded keeps memory
+    proportional to the number of candidates rather than their payload size.
+    """
+
+    __slots__ = ("id", "channel_id", "guild_id", "content", "timestamp", "mentions", "reactions")
+
+    def __init__(self, id: str, channel_id: str, content: str = "", timestamp: str = "", mentions: Tuple[str, ...] = (), reactions: frozenset = frozenset(), guild_id: Optional[str] = None):
+        self.id = id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.content = content
+        self.timestamp = timestamp
+        # IDs of the mentioned users
+        self.mentions = mentions
+        # emoji_key of every reaction the current user has added
+        self.reactions = reactions
+
+    @classmethod
+    def from_api(cls, data: Dict, channel_id: Optional[str] = None) -> "MessageRecord":
+        """Project a message object from the API or gateway"""
+        return cls(
+            id=data['id'],
+            channel_id=data.get('channel_id') or channel_id,
+            content=data.get('content', ''),
+            timestamp=data.get('timestamp', ''),
+            mentions=tuple(mention.get('id') for mention in data.get('mentions', ())),
+            reactions=frozenset(
+                emoji_key(reaction['emoji'].get('name'), reaction['emoji'].get('id'))
+                for reaction in data.get('reactions', ()) if reaction.get('me') and reaction.get('emoji')
+            ),
+            guild_id=data.get('guild_id'),
+        )
+
+
+class MessageMatcher:
+    """Keyword and mention matcher compiled once per run
+
+    Keywords and aliases are casefolded and Unicode-normalized, so "sinh nhật"
+    matches both its composed and decomposed spellings, and are combined into a
+    single regex so each message is scanned once.
+    """
+
+    def __init__(self, keywords: List[str], aliases: Optional[List[str]] = None, user_id: Optional[str] = None, user_ids: Optional[List[str]] = None):
+        # Users whose @mention counts as mentioning the target
+        self.user_ids = set(user_ids or [])
+        if user_id:
+            self.user_ids.add(user_id)
+
+        # Map each normalized keyword back to how it was configured
+        self.keywords: Dict[str, str] = {}
+        for keyword in keywords:
+            self.keywords.setdefault(normalize_text(keyword), keyword)
+        self.keyword_pattern = self._compile(self.keywords)
+        self.alias_pattern = self._compile(normalize_text(alias) for alias in (aliases or []))
+        self.mention_pattern = None
+        if self.user_ids:
+            ids = "|".join(re.escape(user_id) for user_id in sorted(self.user_ids))
+            self.mention_pattern = re.compile(rf"<@!?(?:{ids})>")
+
+    @staticmethod
+    def _compile(terms) -> Optional[re.Pattern]:
+        # Longest first so overlapping keywords report the most specific match
+        terms = sorted({term for term in terms if term}, key=len, reverse=True)
+        if not terms:
+            return None
+        return re.compile("|".join(re.escape(term) for term in terms))
+
+    def scan(self, msg: MessageRecord, text: Optional[str] = None) -> Tuple[Optional[str], bool]:
+        """Return (matched keyword, whether the target is mentioned) for a message
+
+        The mention check is skipped (False) when no keyword matched. `text` is
+        the message content already passed through normalize_text(), when the
+        caller has it.
+        """
+        if self.keyword_pattern is None:
+            return None, False
+
+        content = msg.content
+        if text is None:
+            text = normalize_text(content)
+        found = self.keyword_pattern.search(text)
+        if found is None:
+            return None, False
+        return self.keywords[found.group()], self._mentions_target(msg, content, text)
+
+    def match(self, msg: MessageRecord) -> Optional[str]:
+        """Return the matched keyword if the message has a keyword and mentions the target"""
+        keyword, mentioned = self.scan(msg)
+        return keyword if mentioned else None
+
+    def _mentions_target(self, msg: MessageRecord, content: str, text: str) -> bool:
+        # Method 1: Check mentions array
+        if self.user_ids and not self.user_ids.isdisjoint(msg.mentions):
+            return True
+
+        # Method 2: Check for plain text aliases (e.g. "Hieu Le")
+        if self.alias_pattern is not None and self.alias_pattern.search(text):
+            return True
+
+        # Method 3: Check for Discord mention format <@user_id> or <@!user_id>
+        return self.mention_pattern is not None and self.mention_pattern.search(content) is not None
+
+
+class ReactionRule:
+    """One celebrant configuration: keywords, mention targets, emojis and date window
+
+    `mentions` lists the user IDs whose @mention counts; "@me" stands for the
+    logged-in user. Rules without a date filter use the run's DATE_FILTER.
+    """
+
+    def __init__(self, name: str, keywords: List[str], emojis: List[str], mentions: Optional[List[str]] = None, aliases: Optional[List[str]] = None, date_filter: Optional[str] = None):
+        self.name = name
+        self.keywords = keywords
+        self.emojis = emojis
+        self.mentions = mentions if mentions is not None else ["@me"]
+        self.aliases = aliases or []
+        self.date_filter = date_filter
+
+    @classmethod
+    def from_dict(cls, data: Dict, default_emojis: List[str]) -> "ReactionRule":
+        """Build a rule from one entry of a rules file"""
+        return cls(
+            name=data.get("name", "rule"),
+            keywords=data.get("keywords", ["birthday"]),
+            emojis=data.get("emojis", default_emojis),
+            mentions=data.get("mentions"),
+            aliases=data.get("aliases"),
+            date_filter=data.get("date_filter"),
+        )
+
+
+class RuleSet:
+    """Reaction rules compiled for one run and evaluated in a single pass per message
+
+    Every fetched page is checked against all rules at once, so fetch cost
+    does not grow with the number of rules. The emojis of all matching rules are
+    merged, in order and without duplicates.
+    """
+
+    def __init__(self, rules: List[ReactionRule], user_id: Optional[str] = None, date_filter: Optional[str] = None, now: Optional[datetime] = None):
+        self.rules = rules
+        self.compiled: List[Tuple[ReactionRule, MessageMatcher, Optional[Tuple[int, int]]]] = []
+
+        keywords: Dict[str, str] = {}
+        windows = []
+        for rule in rules:
+            user_ids = [user_id if target == "@me" else target for target in rule.mentions]
+            matcher = MessageMatcher(rule.keywords, rule.aliases, user_ids=[uid for uid in user_ids if uid])
+
+            rule_filter = rule.date_filter or date_filter
+            window = None
+            if rule_filter:
+                try:
+                    window = parse_date_window(rule_filter, now=now)
+                except ValueError:
+                    log.warning("⚠ Invalid date format in rule '%s': %s, expected YYYY-MM-DD, 'today' or 'start..end'", rule.name, rule_filter)
+            windows.append(window)
+
+            self.compiled.append((rule, matcher, window))
+            for normalized, keyword in matcher.keywords.items():
+                keywords.setdefault(normalized, keyword)
+
+        # Keywords across all rules, as configured
+        self.keywords = list(keywords.values())
+
+        # Messages can only match inside the union of the rule windows
+        self.window: Optional[Tuple[int, int]] = None
+        if windows and all(windows):
+            self.window = (min(w[0] for w in windows), max(w[1] for w in windows))
+
+    @property
+    def search_mention(self) -> Optional[str]:
+        """The one user ID every rule requires a mention of, if search can be narrowed to it"""
+        targets = set()
+        for rule, matcher, _ in self.compiled:
+            if rule.aliases:
+                return None
+            targets |= matcher.user_ids
+        return targets.pop() if len(targets) == 1 else None
+
+    def evaluate(self, msg: MessageRecord) -> Tuple[List[str], Optional[str]]:
+        """Return (emojis to react with, first matched keyword) for a message
+
+        The keyword is reported whenever any rule's keywords match, even if no
+        rule matched fully (the emoji list is then empty).
+        """
+        message_id = int(msg.id)
+        text = normalize_text(msg.content)
+
+        emojis: List[str] = []
+        first_keyword = None
+        for rule, matcher, window in self.compiled:
+            if window and not window[0] <= message_id < window[1]:
+                continue
+            keyword, mentioned = matcher.scan(msg, text)
+            if keyword is None:
+                continue
+            if first_keyword is None:
+                first_keyword = keyword
+            if mentioned:
+                for emoji in rule.emojis:
+                    if emoji not in emojis:
+                        emojis.append(emoji)
+        return emojis, first_keyword
+
+
+class DeadlineExceeded(BaseException):
+    """Raised when a request would start after the run's time budget is spent
+
+    Derives from BaseException so the per-channel `except Exception` handlers
+    let it through and the whole run stops, instead of each channel failing on
+    its own.
+    """
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while its endpoint's circuit is open"""
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for transient request failures
+
+    Failures are classed as "connection" (resets, timeouts) or "server" (5xx),
+    each with its own base delay. The delay for attempt n is drawn uniformly
+    from [0, min(cap, base * 2**n)] ("full jitter"), so concurrent scans that
+    fail together do not retry in lockstep. 429s are paced by the RateLimiter.
+    """
+
+    BASE_DELAYS = {"connection": 1.0, "server": 0.5}
+
+    def __init__(self, max_retries: int = 3, cap: float = 30.0, base_delays: Optional[Dict[str, float]] = None):
+        self.max_retries = max_retries
+        self.cap = cap
+        self.base_delays = dict(self.BASE_DELAYS, **(base_delays or {}))
+
+    @staticmethod
+    def classify(response: Optional[requests.Response] = None, error: Optional[Exception] = None) -> Optional[str]:
+        """Return the failure class of a response or exception, None if it should not be retried"""
+        if error is not None:
+            if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return "connection"
+            return None
+        if response is not None and response.status_code >= 500:
+            return "server"
+        return None
+
+    def delay(self, failure: str, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.cap, self.base_delays.get(failure, 1.0) * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker
+
+    After `threshold` consecutive failures on a route, requests to it fail fast
+    with CircuitOpenError for `cooldown` seconds. Then one trial request is let
+    through: success closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures: Dict[str, int] = {}
+        self.open_until: Dict[str, float] = {}
+
+    def check(self, route: str):
+        """Raise CircuitOpenError if the route's circuit is open"""
+        with self.lock:
+            open_until = self.open_until.get(route)
+            if open_until is None:
+                return
+            now = time.monotonic()
+            if now < open_until:
+                raise CircuitOpenError(f"Circuit open for {route} for another {open_until - now:.1f}s")
+            # Half-open: let this request through, hold back others until it reports
+            self.open_until[route] = now + self.cooldown
+
+    def success(self, route: str):
+        with self.lock:
+            self.failures.pop(route, None)
+            self.open_until.pop(route, None)
+
+    def failure(self, route: str) -> bool:
+        """Record a failure; return True if it opened the circuit"""
+        with self.lock:
+            self.failures[route] = self.failures.get(route, 0) + 1
+            if self.failures[route] >= self.threshold:
+                opened = route not in self.open_until
+                self.open_until[route] = time.monotonic() + self.cooldown
+                return opened
+            return False
+
+
+class RateLimiter:
+    """Tracks Discord rate limit buckets and paces requests accordingly
+
+    Bucket state is learned from the X-RateLimit-* response headers, so a request
+    only waits when the server says the bucket is exhausted, and only for exactly
+    as long as the server says. Global 429s pause every route.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.route_buckets: Dict[str, str] = {}
+        self.buckets: Dict[str, Dict[str, float]] = {}
+        self.global_reset_at = 0.0
+
+    @staticmethod
+    def route_key(method: str, path: str) -> Tuple[str, str]:
+        """Return the (route, major parameter) pair for a request path"""
+        parts = path.strip('/').split('/')
+        major = ""
+        if len(parts) > 1 and parts[0] in MAJOR_PARAMETERS:
+            major = f"{parts[0]}/{parts[1]}"
+
+        template = []
+        for i, part in enumerate(parts):
+            if i > 0 and parts[i - 1] == "reactions":
+                template.append("{emoji}")
+            elif part.isdigit() and not (i == 1 and major):
+                template.append("{id}")
+            else:
+                template.append(part)
+        return f"{method} /{'/'.join(template)}", major
+
+    def _bucket_key(self, route: str, major: str) -> str:
+        bucket = self.route_buckets.get(route)
+        if bucket is None:
+            return route
+        return f"{bucket}:{major}"
+
+    def acquire(self, route: str, major: str) -> float:
+        """Block until a request on this route may be sent, returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                delay = self.global_reset_at - now
+                if delay <= 0:
+                    state = self.buckets.get(self._bucket_key(route, major))
+                    if state is None:
+                        return waited
+                    if state["reset_at"] <= now:
+                        # Window has elapsed, assume a full bucket until told otherwise
+                        state["remaining"] = state["limit"]
+                        state["reset_at"] = now + state["window"]
+                    if state["remaining"] > 0:
+                        state["remaining"] -= 1
+                        return waited
+                    delay = state["reset_at"] - now
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, route: str, major: str, response: requests.Response) -> Optional[float]:
+        """Record rate limit headers from a response
+
+        Returns the number of seconds to back off if the response was a 429.
+        """
+        headers = response.headers
+        with self.lock:
+            bucket = headers.get("X-RateLimit-Bucket")
+            if bucket:
+                self.route_buckets[route] = bucket
+            key = self._bucket_key(route, major)
+            now = time.monotonic()
+
+            remaining = headers.get("X-RateLimit-Remaining")
+            reset_after = headers.get("X-RateLimit-Reset-After")
+            if remaining is not None and reset_after is not None:
+                remaining = int(remaining)
+                reset_after = float(reset_after)
+                self.buckets[key] = {
+                    "limit": int(headers.get("X-RateLimit-Limit", remaining + 1)),
+                    "remaining": remaining,
+                    "reset_at": now + reset_after,
+                    "window": reset_after,
+                }
+
+            if response.status_code != 429:
+                return None
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            retry_after = body.get("retry_after")
+            if retry_after is None:
+                retry_after = headers.get("Retry-After", 1.0)
+            retry_after = float(retry_after)
+            is_global = (
+                body.get("global", False)
+                or headers.get("X-RateLimit-Global") == "true"
+                or headers.get("X-RateLimit-Scope") == "global"
+            )
+            if is_global:
+                self.global_reset_at = max(self.global_reset_at, now + retry_after)
+            else:
+                state = self.buckets.setdefault(
+                    key, {"limit": 1, "remaining": 0, "reset_at": now, "window": retry_after}
+                )
+                state["remaining"] = 0
+                state["reset_at"] = max(state["reset_at"], now + retry_after)
+            return retry_after
+
+
+class HTTPTransport:
+    """Keep-alive HTTP transport shared by all DiscordReactor endpoints
+
+    Reuses pooled connections instead of opening a new TCP+TLS connection per
+    call, and applies connect/read timeouts so a hung socket cannot stall a run.
+    Any object with a compatible request() method can be injected into
+    DiscordReactor in its place (e.g. a stub in tests).
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0, read_timeout: float = 30.0):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Send a request over the pooled session"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+def open_cassette(path: str, mode: str):
+    """Open a cassette file as text, gzip-compressed if the path ends in .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RecordingTransport:
+    """Transport wrapper that records every request and response to a cassette
+
+    The first line records when the recording started, so a replay resolves
+    "today" date filters to the same window. Each exchange is then written as
+    one JSON line with the method, URL, params and JSON body, the response
+    status, rate-limit headers and body, the time it took and its offset from
+    the start of the recording. Request headers are not recorded and the token
+    is redacted wherever else it appears, so cassettes can be shared to
+    reproduce a slow run offline.
+    """
+
+    RECORDED_HEADERS = ("Content-Type", "Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset-After", "X-RateLimit-Bucket", "X-RateLimit-Global", "X-RateLimit-Scope")
+
+    def __init__(self, inner, path: str, token: Optional[str] = None):
+        self.inner = inner
+        self.path = path
+        self.token = token
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.file = open_cassette(path, "w")
+        recorded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.file.write(json.dumps({"recorded_at": recorded_at}) + "\n")
+
+    def _redact(self, text: str) -> str:
+        return text.replace(self.token, "<redacted>") if self.token else text
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Send a request through the wrapped transport and record the exchange"""
+        offset = time.monotonic() - self.started
+        started = time.perf_counter()
+        response = self.inner.request(method, url, headers=headers, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        entry = {
+            "t": round(offset, 4),
+            "elapsed": round(elapsed, 4),
+            "method": method,
+            "url": url,
+            "params": kwargs.get("params"),
+            "json": kwargs.get("json"),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in self.RECORDED_HEADERS if name in response.headers},
+            "body": response.text,
+        }
+        line = self._redact(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+        return response
+
+    def close(self):
+        """Close the cassette and the wrapped transport"""
+        with self.lock:
+            self.file.close()
+        if hasattr(self.inner, "close"):
+            self.inner.close()
+
+
+class ReplayTransport:
+    """Transport that answers requests from a cassette written by RecordingTransport
+
+    Requests are matched on method, URL path and params (not host, so a
+    cassette recorded against one base URL replays against another); repeated identical requests
+    get the recorded responses in order, and the last one once they run out.
+    With pacing "original" each response is delayed by its recorded latency;
+    with "fast" it is returned immediately and without its rate limit headers
+    and retry_after, so the replayed run does not sleep on the recording's
+    rate limits either. Requests missing from the cassette
+    get a 404. `recorded_at` is when the cassette was recorded, or None for
+    cassettes written before it was stored.
+    """
+
+    def __init__(self, path: str, pacing: str = "original"):
+        self.pacing = pacing
+        self.lock = threading.Lock()
+        self.responses: Dict[Tuple[str, str, str], deque] = {}
+        self.last: Dict[Tuple[str, str, str], Dict] = {}
+        self.misses = 0
+        self.recorded_at: Optional[datetime] = None
+
+        with open_cassette(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "recorded_at" in entry:
+                    self.recorded_at = datetime.fromisoformat(entry["recorded_at"])
+                    continue
+                key = self._key(entry["method"], entry["url"], entry.get("params"))
+                self.responses.setdefault(key, deque()).append(entry)
+
+    @staticmethod
+    def _key(method: str, url: str, params: Optional[Dict]) -> Tuple[str, str, str]:
+        return method, urlsplit(url).path, json.dumps(params or {}, sort_keys=True)
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Return the next recorded response for this request"""
+        key = self._key(method, url, kwargs.get("params"))
+        with self.lock:
+            recorded = self.responses.get(key)
+            if recorded:
+                entry = recorded.popleft()
+                self.last[key] = entry
+            else:
+                entry = self.last.get(key)
+                if entry is None:
+                    self.misses += 1
+
+        if entry is None:
+            log.warning("  ⚠ Replay: no recorded response for %s %s", method, url)
+            entry = {"status": 404, "headers": {"Content-Type": "application/json"}, "body": '{"message": "Not in cassette", "code": 0}'}
+        elif self.pacing == "original":
+            time.sleep(entry.get("elapsed", 0))
+        else:
+            entry = self._without_waits(entry)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        response._content = entry.get("body", "").encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        response.reason = "Replayed"
+        return response
+
+    @staticmethod
+    def _without_waits(entry: Dict) -> Dict:
+        """Strip what would make the client wait: rate limit headers and retry_after"""
+        headers = {
+            name: value for name, value in (entry.get("headers") or {}).items()
+            if not name.startswith("X-RateLimit-") and name != "Retry-After"
+        }
+        body = entry.get("body", "")
+        if entry["status"] in (202, 429):
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and "retry_after" in data:
+                body = json.dumps(dict(data, retry_after=0))
+        return dict(entry, headers=headers, body=body)
+
+    def close(self):
+        if self.misses:
+            log.warning("⚠ Replay: %s request(s) were not in the cassette", self.misses)
+
+
+class RunMetrics:
+    """Per-route request counters and latency histograms plus run counters
+
+    Exported as a JSON run summary and as a Prometheus textfile (for the node
+    exporter's textfile collector).
+    """
+
+    # Latency histogram bucket upper bounds in seconds
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # Friendly names for the routes we care about, keyed by route template
+    ROUTE_NAMES = {
+        "GET /channels/{id}/messages": "messages_list",
+        "GET /channels/{id}/messages/{id}": "get_message",
+        "GET /guilds/{id}/messages/search": "search",
+        "PUT /channels/{id}/messages/{id}/reactions/{emoji}/@me": "reaction_put",
+        "GET /users/@me": "user",
+        "GET /users/@me/guilds": "guilds",
+        "GET /guilds/{id}/channels": "channels",
+        "GET /users/@me/channels": "dm_channels",
+        "GET /gateway": "gateway",
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: Counter = Counter()
+        self.rate_limit_wait = 0.0
+        self.requests: Counter = Counter()  # (route, status) -> count
+        self.latency: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def route_name(cls, route: str) -> str:
+        """Map a rate limiter route to its metrics label"""
+        template = re.sub(r"/\d+", "/{id}", route)
+        return cls.ROUTE_NAMES.get(template, template)
+
+    def increment(self, name: str, value: int = 1):
+        """Increase a run counter (e.g. messages_scanned, reactions_added)"""
+        with self.lock:
+            self.counters[name] += value
+
+    def observe_request(self, route: str, status: str, seconds: float):
+        """Record one HTTP request attempt"""
+        name = self.route_name(route)
+        with self.lock:
+            self.requests[(name, status)] += 1
+            histogram = self.latency.get(name)
+            if histogram is None:
+                histogram = self.latency[name] = {"buckets": [0] * len(self.LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def observe_rate_limit_wait(self, seconds: float):
+        """Record time spent waiting on rate limits"""
+        if seconds > 0:
+            with self.lock:
+                self.rate_limit_wait += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the run summary as a JSON-serializable dict"""
+        with self.lock:
+            routes: Dict[str, Dict[str, Any]] = {}
+            for (name, status), count in sorted(self.requests.items()):
+                route = routes.setdefault(name, {"requests": 0, "by_status": {}})
+                route["requests"] += count
+                route["by_status"][status] = count
+            for name, histogram in self.latency.items():
+                routes[name]["latency_seconds_total"] = round(histogram["sum"], 6)
+                routes[name]["latency_seconds_avg"] = round(histogram["sum"] / histogram["count"], 6)
+
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "requests": sum(self.requests.values()),
+                "rate_limit_wait_seconds": round(self.rate_limit_wait, 3),
+                "counters": dict(self.counters),
+                "routes": routes,
+            }
+
+    def prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            lines.append("# HELP discord_reactor_requests_total HTTP requests sent, by route and status")
+            lines.append("# TYPE discord_reactor_requests_total counter")
+            for (name, status), count in sorted(self.requests.items()):
+                lines.append(f'discord_reactor_requests_total{{route="{name}",status="{status}"}} {count}')
+
+            lines.append("# HELP discord_reactor_request_duration_seconds HTTP request latency, by route")
+            lines.append("# TYPE discord_reactor_request_duration_seconds histogram")
+            for name, histogram in sorted(self.latency.items()):
+                for bound, count in zip(self.LATENCY_BUCKETS, histogram["buckets"]):
+                    lines.append(f'discord_reactor_request_duration_seconds_bucket{{route="{name}",le="{bound}"}} {count}')
+                lines.append(f'discord_reactor_request_duration_seconds_bucket{{route="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'discord_reactor_request_duration_seconds_sum{{route="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'discord_reactor_request_duration_seconds_count{{route="{name}"}} {histogram["count"]}')
+
+            lines.append("# HELP discord_reactor_rate_limit_wait_seconds_total Time spent waiting on rate limits")
+            lines.append("# TYPE discord_reactor_rate_limit_wait_seconds_total counter")
+            lines.append(f"discord_reactor_rate_limit_wait_seconds_total {self.rate_limit_wait:.6f}")
+
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE discord_reactor_{name}_total counter")
+                lines.append(f"discord_reactor_{name}_total {value}")
+
+            lines.append("# TYPE discord_reactor_run_start_time_seconds gauge")
+            lines.append(f"discord_reactor_run_start_time_seconds {self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        """Write the JSON summary and/or Prometheus textfile, replacing them atomically"""
+        for path, render in ((json_path, lambda: json.dumps(self.summary(), indent=2)), (prometheus_path, self.prometheus)):
+            if not path:
+                continue
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(render())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                log.warning("⚠ Failed to write metrics to %s: %s", path, e)
+
+
+class Profiler:
+    """Opt-in timing spans and per-phase cProfile capture
+
+    Spans are recorded as Chrome trace events, one lane per thread, so a run
+    can be opened in chrome://tracing, Perfetto or speedscope to see where
+    the time goes. Phases are top-level spans that can additionally be
+    captured with cProfile into <cprofile_dir>/<phase>.prof. cProfile only
+    sees the thread that entered the phase, so use CONCURRENCY=1 for complete
+    profiles. When disabled, span() returns a shared no-op context.
+    """
+
+    MAX_EVENTS = 500000
+
+    def __init__(self, trace_path: Optional[str] = None, cprofile_dir: Optional[str] = None):
+        self.trace_path = trace_path
+        self.cprofile_dir = cprofile_dir
+        self.enabled = bool(trace_path or cprofile_dir)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.events: List[Dict] = []
+        self.threads: Dict[int, str] = {}
+        self.totals: Dict[str, List[float]] = {}
+        self.profiles: Dict[str, cProfile.Profile] = {}
+
+    def span(self, name: str, **args):
+        """Context manager timing one span, with optional args shown in the trace"""
+        if not self.enabled:
+            return NO_SPAN
+        return self._span(name, args)
+
+    def phase(self, name: str):
+        """Context manager for a top-level phase, also profiled with cProfile if configured"""
+        if not self.enabled:
+            return NO_SPAN
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, args: Dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter(), args)
+
+    @contextlib.contextmanager
+    def _phase(self, name: str):
+        profile = None
+        if self.cprofile_dir:
+            with self.lock:
+                profile = self.profiles.setdefault(name, cProfile.Profile())
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                profile = None
+
+        try:
+            with self._span(name, {}):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def _record(self, name: str, start: float, end: float, args: Dict):
+        thread = threading.current_thread()
+        with self.lock:
+            total = self.totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += end - start
+            if len(self.events) >= self.MAX_EVENTS:
+                return
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self.started) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": 1,
+                "tid": thread.ident,
+                "args": args,
+            })
+
+    def summary(self, top: int = 8) -> List[Tuple[str, int, float]]:
+        """Return (span name, count, total seconds) for the spans with the most total time"""
+        with self.lock:
+            totals = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, int(count), round(seconds, 3)) for name, (count, seconds) in totals[:top]]
+
+    def export(self):
+        """Write the trace file and per-phase cProfile stats, if configured"""
+        if self.trace_path:
+            with self.lock:
+                events = [
+                    {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                    for tid, name in self.threads.items()
+                ] + list(self.events)
+            tmp_path = f"{self.trace_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+                os.replace(tmp_path, self.trace_path)
+            except OSError as e:
+                log.warning("⚠ Failed to write trace to %s: %s", self.trace_path, e)
+
+        if self.cprofile_dir:
+            try:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                with self.lock:
+                    profiles = list(self.profiles.items())
+                for name, profile in profiles:
+                    profile.dump_stats(os.path.join(self.cprofile_dir, f"{name}.prof"))
+            except OSError as e:
+                log.warning("⚠ Failed to write profiles to %s: %s", self.cprofile_dir, e)
+
+
+NO_SPAN = contextlib.nullcontext()
+
+
+class ReactionWork:
+    """Reactions planned for one message, waiting in the reaction pipeline
+
+    on_done is called from the worker thread once every emoji has been
+    attempted, with whether all of them were added.
+    """
+
+    __slots__ = ("channel_id", "message_id", "emojis", "on_done", "remaining", "ok")
+
+    def __init__(self, channel_id: str, message_id: str, emojis: List[Emoji], on_done: Optional[Callable[[bool], None]] = None):
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.emojis = emojis
+        self.on_done = on_done
+        self.remaining = len(emojis)
+        self.ok = True
+
+
+class ReactionPipeline:
+    """Producer/consumer stage between message discovery and reactions
+
+    Discovery submits ReactionWork into bounded per-channel queues and carries
+    on scanning. Worker threads drain the queues one emoji at a time, waiting a
+    random delay_min..delay_max between reactions in the same channel, so
+    reactions in different channels interleave instead of being serialized.
+    """
+
+    def __init__(self, react: Callable[[str, str, Emoji], bool], workers: int = 2, channel_queue_size: int = 100, delay_min: float = 1.0, delay_max: float = 2.0):
+        self.react = react
+        self.worker_count = max(1, workers)
+        self.channel_queue_size = max(1, channel_queue_size)
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+
+        self.cond = threading.Condition()
+        self.queues: Dict[str, deque] = {}
+        self.next_ready: Dict[str, float] = {}
+        self.busy: Set[str] = set()
+        self.pending = 0
+        self.closed = False
+        self.workers: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker threads"""
+        for _ in range(self.worker_count):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, work: ReactionWork, block: bool = True) -> bool:
+        """Queue a message's missing reactions
+
+        Blocks while the channel's queue is full, or returns False instead when
+        block is False.
+        """
+        with self.cond:
+            # Workers delete a channel's deque once it drains, so look it up
+            # again after every wait rather than appending to a stale one
+            while len(self.queues.get(work.channel_id, ())) >= self.channel_queue_size:
+                if not block:
+                    return False
+                self.cond.wait()
+            channel_queue = self.queues.setdefault(work.channel_id, deque())
+            for emoji in work.emojis:
+                channel_queue.append((work, emoji))
+            self.pending += len(work.emojis)
+            self.cond.notify_all()
+        return True
+
+    def join(self):
+        """Wait until every queued reaction has been attempted"""
+        with self.cond:
+            while self.pending:
+                self.cond.wait()
+
+    def close(self):
+        """Drain the queues and stop the workers"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def _next_channel(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        # Pick the ready channel that has waited longest, or report how long
+        # until the next one becomes ready
+        best, best_ready, wait = None, None, None
+        for channel_id, channel_queue in self.queues.items():
+            if not channel_queue or channel_id in self.busy:
+                continue
+            ready_at = self.next_ready.get(channel_id, 0.0)
+            if ready_at <= now:
+                if best_ready is None or ready_at < best_ready:
+                    best, best_ready = channel_id, ready_at
+            elif wait is None or ready_at - now < wait:
+                wait = ready_at - now
+        return best, wait
+
+    def _work(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.closed and self.pending == 0:
+                        return
+                    channel_id, wait = self._next_channel(time.monotonic())
+                    if channel_id is not None:
+                        break
+                    self.cond.wait(wait)
+                work, emoji = self.queues[channel_id].popleft()
+                if not self.queues[channel_id]:
+                    del self.queues[channel_id]
+                self.busy.add(channel_id)
+                self.cond.notify_all()
+
+            success = False
+            try:
+                success = self.react(channel_id, work.message_id, emoji)
+            except Exception as e:
+                log.error("    ✗ Error adding reaction: %s", e)
+            finally:
+                with self.cond:
+                    work.ok = work.ok and bool(success)
+                    work.remaining -= 1
+                    finished = work.remaining == 0
+                if finished and work.on_done is not None:
+                    try:
+                        work.on_done(work.ok)
+                    except Exception as e:
+                        log.error("    ✗ Error completing reactions for message %s: %s", work.message_id, e)
+                with self.cond:
+                    self.busy.discard(channel_id)
+                    self.next_ready[channel_id] = time.monotonic() + random.uniform(self.delay_min, self.delay_max)
+                    self.pending -= 1
+                    self.cond.notify_all()
+
+
+def split_snowflake_range(lower: int, upper: int, segments: int) -> List[Tuple[int, int]]:
+    """Split [lower, upper) into up to `segments` contiguous snowflake ranges of equal time span"""
+    segments = max(1, min(segments, upper - lower))
+    step = (upper - lower) // segments
+    bounds = [lower + i * step for i in range(segments)] + [upper]
+    return [(bounds[i], bounds[i + 1]) for i in range(segments)]
+
+
+class BackfillProgress:
+    """Persists how far each backfill segment of each channel has been read
+
+    Segments are keyed by their snowflake bounds, so an interrupted backfill
+    over the same range resumes each segment from its last page, while a
+    different range or segment count starts fresh.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.segments: Dict[str, Dict[str, int]] = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.segments = {
+                        channel_id: {key: int(cursor) for key, cursor in segments.items()}
+                        for channel_id, segments in json.load(f).items()
+                    }
+            except (OSError, ValueError, AttributeError) as e:
+                log.warning("⚠ Failed to load backfill progress from %s: %s", path, e)
+
+    @staticmethod
+    def key(lower: int, upper: int) -> str:
+        return f"{lower}-{upper}"
+
+    def get(self, channel_id: str, lower: int, upper: int) -> Optional[int]:
+        """Return the newest message ID read in a segment, if any"""
+        with self.lock:
+            return self.segments.get(channel_id, {}).get(self.key(lower, upper))
+
+    def is_done(self, channel_id: str, lower: int, upper: int) -> bool:
+        cursor = self.get(channel_id, lower, upper)
+        return cursor is not None and cursor >= upper - 1
+
+    def advance(self, channel_id: str, lower: int, upper: int, cursor: int):
+        """Record that a segment has been read up to and including `cursor`"""
+        with self.lock:
+            self.segments.setdefault(channel_id, {})[self.key(lower, upper)] = cursor
+            self._save()
+
+    def complete(self, channel_id: str, lower: int, upper: int):
+        """Mark a segment as fully read"""
+        self.advance(channel_id, lower, upper, upper - 1)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({channel_id: {key: str(cursor) for key, cursor in segments.items()} for channel_id, segments in self.segments.items()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠ Failed to save backfill progress to %s: %s", self.path, e)
+
+
+class PollScheduler:
+    """Per-channel polling intervals for daemon mode
+
+    Every channel starts at min_interval. A poll that finds matches resets it to
+    min_interval, one that only finds new messages halves it, and an idle poll
+    multiplies it by `backoff` up to max_interval, so busy channels are polled
+    often and quiet ones almost never.
+    """
+
+    def __init__(self, min_interval: float = 30.0, max_interval: float = 1800.0, backoff: float = 2.0):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.intervals: Dict[str, float] = {}
+        self.next_poll: Dict[str, float] = {}
+        self.guilds: Dict[str, str] = {}
+
+    def add(self, guild_id: str, channel_id: str, active: bool = True):
+        """Schedule a channel; inactive channels start at max_interval"""
+        if channel_id in self.intervals:
+            return
+        self.guilds[channel_id] = guild_id
+        interval = self.min_interval if active else self.max_interval
+        self.intervals[channel_id] = interval
+        self.next_poll[channel_id] = time.monotonic() + (0 if active else interval)
+
+    def remove(self, channel_id: str):
+        self.intervals.pop(channel_id, None)
+        self.next_poll.pop(channel_id, None)
+        self.guilds.pop(channel_id, None)
+
+    def wake(self, channel_id: str):
+        """Poll a channel as soon as possible, e.g. when its listing shows new messages"""
+        if channel_id in self.intervals:
+            self.intervals[channel_id] = self.min_interval
+            self.next_poll[channel_id] = time.monotonic()
+
+    def record(self, channel_id: str, new_messages: bool, matches: int):
+        """Adapt a channel's interval to the outcome of a poll and schedule the next one"""
+        if channel_id not in self.intervals:
+            return
+        interval = self.intervals[channel_id]
+        if matches:
+            interval = self.min_interval
+        elif new_messages:
+            interval = max(self.min_interval, interval / 2)
+        else:
+            interval = min(self.max_interval, interval * self.backoff)
+        self.intervals[channel_id] = interval
+        self.next_poll[channel_id] = time.monotonic() + interval
+
+    def due(self) -> List[Tuple[str, str]]:
+        """Return (guild_id, channel_id) for every channel whose poll is due"""
+        now = time.monotonic()
+        return [(self.guilds[channel_id], channel_id) for channel_id, at in self.next_poll.items() if at <= now]
+
+    def wait_time(self) -> float:
+        """Seconds until the next poll is due"""
+        if not self.next_poll:
+            return self.max_interval
+        return max(0.0, min(self.next_poll.values()) - time.monotonic())
+
+
+class CommitTracker:
+    """Holds a read cursor back until the reactions planned below it are confirmed
+
+    Scanners hold each message they hand to react_to_message and report how far
+    they have read once every match is handed off; reactions release their
+    message when all planned emojis were attempted, possibly on a pipeline
+    worker. on_advance is only called with cursors that do not pass a message
+    whose reactions are outstanding or failed transiently, so those are read
+    again next time. Reactions Discord rejected for good release as ok.
+    """
+
+    def __init__(self, on_advance: Callable[[int], None]):
+        self.on_advance = on_advance
+        self.lock = threading.Lock()
+        self.read: Optional[int] = None
+        self.advanced: Optional[int] = None
+        self.held: Counter = Counter()
+        self.failed: Set[int] = set()
+
+    def hold(self, message_id: str) -> bool:
+        """Hold a message until release(); False if its reactions are already in flight"""
+        with self.lock:
+            message_id = int(message_id)
+            if self.held[message_id]:
+                return False
+            self.held[message_id] += 1
+            return True
+
+    def release(self, message_id: str, ok: bool):
+        """Report that a held message's reactions were all added (ok) or not"""
+        with self.lock:
+            message_id = int(message_id)
+            self.held[message_id] -= 1
+            if self.held[message_id] <= 0:
+                del self.held[message_id]
+            if ok:
+                self.failed.discard(message_id)
+            else:
+                self.failed.add(message_id)
+            self._advance()
+
+    def read_up_to(self, cursor: int):
+        """Report that every message up to cursor has been read and handed off"""
+        with self.lock:
+            if self.read is None or cursor > self.read:
+                self.read = cursor
+            self._advance()
+
+    def _advance(self):
+        if self.read is None:
+            return
+        target = self.read
+        if self.held or self.failed:
+            target = min(target, min(min(self.held, default=target + 1), min(self.failed, default=target + 1)) - 1)
+        if self.advanced is None or target > self.advanced:
+            self.advanced = target
+            self.on_advance(target)
+
+
+class CheckpointStore:
+    """Persists the newest processed message snowflake per channel
+
+    A checkpoint is staged when a page of messages is fetched and committed
+    once its matches have been handed off. The checkpoint itself only advances
+    as far as the reactions are confirmed (see CommitTracker), so a crash,
+    a failed reaction or a run cut short with reactions still queued re-scans
+    those messages on the next run instead of losing them. With no path the
+    checkpoints live in memory for the life of the process.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.checkpoints: Dict[str, int] = {}
+        self.pending: Dict[str, int] = {}
+        self.trackers: Dict[str, CommitTracker] = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.checkpoints = {channel_id: int(message_id) for channel_id, message_id in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                log.warning("⚠ Failed to load checkpoints from %s: %s", path, e)
+
+    def get(self, channel_id: str) -> Optional[int]:
+        """Return the newest processed message ID for a channel, if any"""
+        with self.lock:
+            return self.checkpoints.get(channel_id)
+
+    def stage(self, channel_id: str, message_id: int):
+        """Remember the newest fetched message ID until commit() is called"""
+        with self.lock:
+            if message_id > self.pending.get(channel_id, 0):
+                self.pending[channel_id] = message_id
+
+    def tracker(self, channel_id: str) -> CommitTracker:
+        """Return the channel's tracker, which reactions hold and release messages on"""
+        with self.lock:
+            tracker = self.trackers.get(channel_id)
+            if tracker is None:
+                tracker = self.trackers[channel_id] = CommitTracker(lambda message_id: self.advance(channel_id, message_id))
+            return tracker
+
+    def latest(self, channel_id: str) -> Optional[int]:
+        """Return the newest message ID read from a channel, confirmed or not"""
+        with self.lock:
+            tracker = self.trackers.get(channel_id)
+            checkpoint = self.checkpoints.get(channel_id)
+        read = tracker.read if tracker is not None else None
+        if read is None or (checkpoint is not None and checkpoint > read):
+            return checkpoint
+        return read
+
+    def commit(self, channel_id: str):
+        """Hand the staged message ID to the channel's tracker, which advances
+        the checkpoint once the reactions held on it are confirmed"""
+        with self.lock:
+            message_id = self.pending.pop(channel_id, None)
+        if message_id is not None:
+            self.tracker(channel_id).read_up_to(message_id)
+
+    def advance(self, channel_id: str, message_id: int):
+        """Advance a channel's checkpoint to message_id and persist it"""
+        with self.lock:
+            if message_id <= self.checkpoints.get(channel_id, 0):
+                return
+            self.checkpoints[channel_id] = message_id
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({channel_id: str(message_id) for channel_id, message_id in self.checkpoints.items()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠ Failed to save checkpoints to %s: %s", self.path, e)
+
+
+class ReactionLedger:
+    """SQLite record of reactions confirmed by the API, keyed by message ID
+
+    Lets re-runs skip messages that were already handled without fetching them
+    or re-sending reactions. The default ":memory:" database lasts only as long
+    as the process.
+    """
+
+    # Stay well below SQLite's limit on bound parameters per statement
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, path: str = ":memory:"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS reactions ("
+                "message_id TEXT NOT NULL, emoji TEXT NOT NULL, added_at REAL NOT NULL, "
+                "PRIMARY KEY (message_id, emoji))"
+            )
+
+    def lookup(self, message_ids: List[str]) -> Dict[str, Set[str]]:
+        """Return the emoji_key of every confirmed emoji for each of the given message IDs"""
+        confirmed: Dict[str, Set[str]] = {}
+        with self.lock:
+            for i in range(0, len(message_ids), self.LOOKUP_CHUNK_SIZE):
+                chunk = message_ids[i:i + self.LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT message_id, emoji FROM reactions WHERE message_id IN ({placeholders})",
+                    chunk
+                )
+                for message_id, emoji in rows:
+                    # Rows written before emojis were keyed may carry variation selectors
+                    confirmed.setdefault(message_id, set()).add(emoji_key(emoji))
+        return confirmed
+
+    def record(self, message_id: str, emoji: str):
+        """Record that the user has reacted to a message with an emoji (by emoji_key)"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO reactions (message_id, emoji, added_at) VALUES (?, ?, ?)",
+                (message_id, emoji, time.time())
+            )
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+
+class GatewayClient:
+    """Minimal Discord gateway client used by listen mode
+
+    Handles HELLO/heartbeating, IDENTIFY, and RESUME after a disconnect, and
+    passes every dispatch event to `on_dispatch(event_name, data)`. The gateway
+    URL can point at a local fake gateway for testing. Requires the
+    websocket-client package.
+    """
+
+    OP_DISPATCH = 0
+    OP_HEARTBEAT = 1
+    OP_IDENTIFY = 2
+    OP_RESUME = 6
+    OP_RECONNECT = 7
+    OP_INVALID_SESSION = 9
+    OP_HELLO = 10
+    OP_HEARTBEAT_ACK = 11
+
+    # Close codes after which reconnecting cannot succeed (bad token, etc.)
+    FATAL_CLOSE_CODES = {4004, 4010, 4011, 4012, 4013, 4014}
+
+    def __init__(self, token: str, url: str, on_dispatch: Callable[[str, Dict], None], reconnect_delay: float = 5.0):
+        self.token = token
+        self.url = url
+        self.on_dispatch = on_dispatch
+        self.reconnect_delay = reconnect_delay
+
+        self.session_id: Optional[str] = None
+        self.resume_url: Optional[str] = None
+        self.sequence: Optional[int] = None
+
+        self.ws = None
+        self.send_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.heartbeat_acked = True
+
+    def run_forever(self):
+        """Connect and process events until stop() is called or the session is fatally closed"""
+        try:
+            import websocket
+        except ImportError:
+            raise RuntimeError("Listen mode requires the websocket-client package (pip install websocket-client)")
+
+        while not self.stopped.is_set():
+            url = self.resume_url if self.session_id and self.resume_url else self.url
+            try:
+                close_code = self._run_session(websocket, url)
+            except (websocket.WebSocketException, OSError, ValueError) as e:
+                log.warning("⚠ Gateway connection lost: %s", e)
+                close_code = None
+
+            if close_code in self.FATAL_CLOSE_CODES:
+                log.error("✗ Gateway closed the connection with code %s, not reconnecting", close_code)
+                return
+            if not self.stopped.is_set():
+                log.info("ℹ  Reconnecting to gateway in %ss...", self.reconnect_delay)
+                self.stopped.wait(self.reconnect_delay)
+
+    def stop(self):
+        """Stop the client and close the current connection"""
+        self.stopped.set()
+        if self.ws is not None:
+            self.ws.close()
+
+    def _send(self, op: int, data):
+        with self.send_lock:
+            self.ws.send(json.dumps({"op": op, "d": data}))
+
+    def _heartbeat_loop(self, interval: float, stop: threading.Event):
+        # First heartbeat is jittered as the gateway asks
+        if stop.wait(interval * random.random()):
+            return
+        while not stop.is_set():
+            if not self.heartbeat_acked:
+                log.warning("⚠ Gateway heartbeat not acknowledged, reconnecting")
+                self.ws.close()
+                return
+            self.heartbeat_acked = False
+            try:
+                self._send(self.OP_HEARTBEAT, self.sequence)
+            except Exception:
+                return
+            stop.wait(interval)
+
+    def _run_session(self, websocket, url: str) -> Optional[int]:
+        """Run one gateway connection, returns the close code if the server sent one"""
+        separator = "&" if "?" in url else "?"
+        self.ws = websocket.create_connection(f"{url}{separator}v=10&encoding=json")
+        heartbeat_stop = threading.Event()
+        try:
+            hello = json.loads(self.ws.recv())
+            if hello.get("op") != self.OP_HELLO:
+                raise ValueError(f"expected HELLO, got op {hello.get('op')}")
+
+            self.heartbeat_acked = True
+            interval = hello["d"]["heartbeat_interval"] / 1000
+            threading.Thread(target=self._heartbeat_loop, args=(interval, heartbeat_stop), daemon=True).start()
+
+            if self.session_id and self.sequence is not None:
+                self._send(self.OP_RESUME, {"token": self.token, "session_id": self.session_id, "seq": self.sequence})
+            else:
+                self._send(self.OP_IDENTIFY, {
+                    "token": self.token,
+                    "properties": {"os": sys.platform, "browser": "discord-birthday-reactor", "device": "discord-birthday-reactor"},
+                })
+
+            while not self.stopped.is_set():
+                opcode, data = self.ws.recv_data()
+                if opcode == websocket.ABNF.OPCODE_CLOSE:
+                    return int.from_bytes(data[:2], "big") if len(data) >= 2 else None
+                if not data:
+                    return None
+
+                payload = json.loads(data)
+                op = payload.get("op")
+                if payload.get("s") is not None:
+                    self.sequence = payload["s"]
+
+                if op == self.OP_DISPATCH:
+                    event = payload.get("t")
+                    if event == "READY":
+                        self.session_id = payload["d"].get("session_id")
+                        self.resume_url = payload["d"].get("resume_gateway_url")
+                    self.on_dispatch(event, payload.get("d") or {})
+                elif op == self.OP_HEARTBEAT:
+                    self._send(self.OP_HEARTBEAT, self.sequence)
+                elif op == self.OP_HEARTBEAT_ACK:
+                    self.heartbeat_acked = True
+                elif op == self.OP_RECONNECT:
+                    return None
+                elif op == self.OP_INVALID_SESSION:
+                    if not payload.get("d"):
+                        # Session cannot be resumed, identify from scratch next time
+                        self.session_id = None
+                        self.resume_url = None
+                        self.sequence = None
+                    return None
+            return None
+        finally:
+            heartbeat_stop.set()
+            self.ws.close()
+
+
+class MetadataCache:
+    """TTL cache for identity, guild, channel and DM listings
+
+    Keys are "<kind>" or "<kind>:<id>" (e.g. "channels:<guild_id>"), and each
+    kind has its own TTL. Entries are kept in memory for long-running processes
+    and persisted to `path` between runs. With refresh=True every key is fetched
+    again once before cached values are trusted.
+    """
+
+    DEFAULT_TTLS = {
+        "user": 24 * 3600,
+        "guilds": 3600,
+        "channels": 3600,
+        "dm_channels": 600,
+    }
+
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, float]] = None, refresh: bool = False):
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.refresh = refresh
+        self.refreshed: Set[str] = set()
+        self.lock = threading.Lock()
+        self.owner: Optional[str] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.owner = data.get("owner")
+                self.entries = data.get("entries", {})
+            except (OSError, ValueError) as e:
+                log.warning("⚠ Failed to load metadata cache from %s: %s", path, e)
+
+    def bind(self, token: str):
+        """Discard cached data that was fetched with a different token"""
+        owner = hashlib.sha256(token.encode()).hexdigest()[:16]
+        with self.lock:
+            if self.owner != owner:
+                self.owner = owner
+                self.entries = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None if missing, expired or due for refresh"""
+        with self.lock:
+            if self.refresh and key not in self.refreshed:
+                return None
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            ttl = self.ttls.get(key.split(":", 1)[0], 0)
+            if time.time() - entry["stored_at"] > ttl:
+                return None
+            return entry["value"]
+
+    def set(self, key: str, value: Any):
+        """Store a value and persist the cache"""
+        with self.lock:
+            self.entries[key] = {"stored_at": time.time(), "value": value}
+            self.refreshed.add(key)
+            self._save()
+
+    def invalidate(self, key: str):
+        """Drop a cached value"""
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def invalidate_channel(self, channel_id: str):
+        """Drop every cached channel listing that contains a channel"""
+        with self.lock:
+            stale = [
+                key for key, entry in self.entries.items()
+                if key.split(":", 1)[0] in ("channels", "dm_channels")
+                and any(channel.get("id") == channel_id for channel in entry["value"])
+            ]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"owner": self.owner, "entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠ Failed to save metadata cache to %s: %s", self.path, e)
+
+
 class DiscordReactor:
-    def __init__(self, token: str, reaction_emojis: List[str] = None, delay_min: float = 1.0, delay_max: float = 2.0):
+    def __init__(self, token: str, reaction_emojis: List[str] = None, delay_min: float = 1.0, delay_max: float = 2.0, max_retries: int = 3, transport: Optional[HTTPTransport] = None, checkpoints: Optional[CheckpointStore] = None, mention_aliases: Optional[List[str]] = None, ledger: Optional[ReactionLedger] = None, metadata: Optional[MetadataCache] = None, guild_scan_mode: str = "search", base_url: str = DEFAULT_API_BASE_URL, metrics_json: Optional[str] = None, metrics_prometheus: Optional[str] = None, reaction_workers: int = 2, reaction_queue_size: int = 100, rules: Optional[List[ReactionRule]] = None, retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None, profiler: Optional[Profiler] = None, now: Optional[datetime] = None):
         self.token = token
-        self.base_url = "https://discord.com/api/v10"
+        self.base_url = base_url
         self.headers = {
             "Authorization": token,
             "Content-Type": "application/json",
@@ -30,385 +1814,761 @@ class DiscordReactor:
         if reaction_emojis is None:
             reaction_emojis = ["❤️", "💖", "🚀"]
 
-        # Create emoji mapping with names
-        emoji_names = ["heart", "rainbow_heart", "rocket", "star", "fire", "sparkles", "tada", "balloon"]
-        self.emojis = {}
-        for i, emoji in enumerate(reaction_emojis):
-            name = emoji_names[i] if i < len(emoji_names) else f"emoji_{i+1}"
-            self.emojis[name] = emoji
+        self.reaction_emojis = reaction_emojis
+
+        # Optional rule table; without one a single rule is built from the
+        # run's keywords, MENTION_ALIASES and reaction_emojis
+        self.rule_configs = rules
+        self.rules: Optional[RuleSet] = None
+
+        # Time "today" date filters are resolved against; None means the
+        # current time, while replays pin it to when the cassette was recorded
+        self.now = now
+
+        # Parse and encode every emoji any rule uses once
+        all_emojis = list(reaction_emojis)
+        for rule in rules or []:
+            all_emojis.extend(rule.emojis)
+        self.emojis = EmojiRegistry(all_emojis)
 
         self.delay_min = delay_min
         self.delay_max = delay_max
 
+        # Reactions are handed to a pipeline while run()/listen() are active
+        self.reaction_workers = reaction_workers
+        self.reaction_queue_size = reaction_queue_size
+        self.pipeline: Optional[ReactionPipeline] = None
+
+        self.rate_limiter = RateLimiter()
+        self.max_retries = max_retries
+        self.retry_policy = retry_policy or RetryPolicy(max_retries)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        # time.monotonic() after which no new scan requests are sent, set by run()
+        self.deadline: Optional[float] = None
+        self.metrics = RunMetrics()
+        self.profiler = profiler or Profiler()
+        self.metrics_json = metrics_json
+        self.metrics_prometheus = metrics_prometheus
+        self.transport = transport if transport is not None else HTTPTransport()
+        self.checkpoints = checkpoints if checkpoints is not None else CheckpointStore()
+        self.ledger = ledger if ledger is not None else ReactionLedger()
+        self.metadata = metadata if metadata is not None else MetadataCache()
+        self.metadata.bind(token)
+
+        # How guilds are scanned when no channel links are given: "search" uses
+        # one guild-wide search, "channels" scans each active text channel
+        self.guild_scan_mode = guild_scan_mode
+
+        # Plain-text names that count as mentioning the user
+        self.mention_aliases = mention_aliases if mention_aliases is not None else ["Hieu Le"]
+
+    def build_rules(self, user_id: Optional[str], keywords: List[str] = None, date_filter: Optional[str] = None) -> RuleSet:
+        """Compile the configured rule table, or a single rule from the run's settings"""
+        rules = self.rule_configs
+        if not rules:
+            rules = [ReactionRule("default", keywords or ["birthday"], self.reaction_emojis, aliases=self.mention_aliases)]
+        return RuleSet(rules, user_id=user_id, date_filter=date_filter, now=self.now)
+
+    def _date_window(self, date_filter: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Snowflake bounds to fetch: the rules' combined window, or the date filter's"""
+        if self.rules is not None:
+            return self.rules.window
+        if date_filter:
+            try:
+                return parse_date_window(date_filter, now=self.now)
+            except ValueError:
+                log.warning("  ⚠ Invalid date format: %s, expected YYYY-MM-DD, 'today' or 'start..end'", date_filter)
+        return None
+
+    def _request(self, method: str, path: str, deadline: bool = True, **kwargs) -> requests.Response:
+        """Send an API request through the rate limiter and circuit breaker
+
+        429 responses are retried after the server's retry_after; connection
+        errors and 5xx responses are retried with jittered exponential backoff.
+        With `deadline` the request raises DeadlineExceeded once the run's time
+        budget is spent, and retries that would overrun it are not attempted.
+        """
+        route, major = self.rate_limiter.route_key(method, path)
+        # Circuits are per endpoint, not per channel or guild
+        endpoint = self.metrics.route_name(route)
+        for attempt in range(self.max_retries + 1):
+            if deadline and self.deadline is not None and time.monotonic() >= self.deadline:
+                raise DeadlineExceeded(f"{method} {path}")
+            self.circuit_breaker.check(endpoint)
+
+            with self.profiler.span("rate_limit_wait"):
+                self.metrics.observe_rate_limit_wait(self.rate_limiter.acquire(route, major))
+            started = time.perf_counter()
+            try:
+                with self.profiler.span("http", route=endpoint):
+                    response = self.transport.request(method, f"{self.base_url}{path}", headers=self.headers, **kwargs)
+            except Exception as e:
+                self.metrics.observe_request(route, "error", time.perf_counter() - started)
+                failure = self.retry_policy.classify(error=e)
+                if failure is None or not self._retry_failure(endpoint, failure, attempt, deadline):
+                    raise
+                continue
+            self.metrics.observe_request(route, str(response.status_code), time.perf_counter() - started)
+
+            failure = self.retry_policy.classify(response=response)
+            if failure is not None:
+                if self._retry_failure(endpoint, failure, attempt, deadline):
+                    continue
+                return response
+            self.circuit_breaker.success(endpoint)
+
+            retry_after = self.rate_limiter.update(route, major, response)
+            if retry_after is None:
+                return response
+            self.metrics.increment("rate_limited")
+            if attempt < self.max_retries:
+                self.metrics.increment("retries")
+                log.warning("  ⚠ Rate limited, retrying in %ss...", retry_after)
+        return response
+
+    def _retry_failure(self, endpoint: str, failure: str, attempt: int, deadline: bool) -> bool:
+        """Record a failed attempt and back off before retrying it
+
+        Returns False without waiting when the request should not be retried:
+        out of attempts, the endpoint's circuit just opened, or the backoff
+        would overrun the run's deadline.
+        """
+        self.metrics.increment(f"{failure}_errors")
+        if self.circuit_breaker.failure(endpoint):
+            self.metrics.increment("circuits_opened")
+            log.warning("  ⚠ Repeated failures on %s, pausing it for %gs", endpoint, self.circuit_breaker.cooldown)
+            return False
+        if attempt >= self.max_retries:
+            return False
+
+        delay = self.retry_policy.delay(failure, attempt)
+        if not self._can_wait(delay, deadline):
+            return False
+        self.metrics.increment("retries")
+        log.warning("  ⚠ %s error on %s, retrying in %.1fs...", failure.capitalize(), endpoint, delay)
+        time.sleep(delay)
+        return True
+
+    def _can_wait(self, delay: float, deadline: bool = True) -> bool:
+        """Whether waiting `delay` seconds before a retry stays inside the run's deadline"""
+        return not (deadline and self.deadline is not None and time.monotonic() + delay >= self.deadline)
+
+    def export_metrics(self):
+        """Write the configured metrics and profiling files"""
+        self.metrics.export(self.metrics_json, self.metrics_prometheus)
+        self.profiler.export()
+
+    def _get_metadata(self, key: str, path: str, fresh: bool = False) -> Any:
+        """Return cached metadata, fetching and caching it on a miss
+
+        With fresh=True the cache is bypassed (but still updated), for callers
+        that need current values such as each channel's last_message_id.
+        """
+        cached = None if fresh else self.metadata.get(key)
+        if cached is not None:
+            return cached
+
+        response = self._request("GET", path)
+        if response.status_code in (403, 404):
+            self.metadata.invalidate(key)
+        response.raise_for_status()
+        data = response.json()
+        self.metadata.set(key, data)
+        return data
+
     def get_user_id(self) -> Optional[str]:
         """Get the current user's ID"""
         try:
-            response = requests.get(
-                f"{self.base_url}/users/@me",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            user_data = response.json()
-            print(f"✓ Logged in as: {user_data['username']}#{user_data['discriminator']}")
+            user_data = self._get_metadata("user", "/users/@me")
+            log.info("✓ Logged in as: %s#%s", user_data['username'], user_data['discriminator'])
             return user_data['id']
         except Exception as e:
-            print(f"✗ Failed to get user info: {e}")
+            log.error("✗ Failed to get user info: %s", e)
             return None
 
     def get_guilds(self) -> List[Dict]:
         """Get all guilds (servers) the user is in"""
         try:
-            response = requests.get(
-                f"{self.base_url}/users/@me/guilds",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_metadata("guilds", "/users/@me/guilds")
         except Exception as e:
-            print(f"✗ Failed to get guilds: {e}")
+            log.error("✗ Failed to get guilds: %s", e)
             return []
 
-    def get_channels(self, guild_id: str) -> List[Dict]:
+    def get_channels(self, guild_id: str, fresh: bool = False) -> List[Dict]:
         """Get all channels in a guild"""
         try:
-            response = requests.get(
-                f"{self.base_url}/guilds/{guild_id}/channels",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_metadata(f"channels:{guild_id}", f"/guilds/{guild_id}/channels", fresh=fresh)
         except Exception as e:
-            print(f"✗ Failed to get channels for guild {guild_id}: {e}")
+            log.error("✗ Failed to get channels for guild %s: %s", guild_id, e)
             return []
 
-    def get_dm_channels(self) -> List[Dict]:
+    def get_dm_channels(self, fresh: bool = False) -> List[Dict]:
         """Get all DM channels"""
         try:
-            response = requests.get(
-                f"{self.base_url}/users/@me/channels",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_metadata("dm_channels", "/users/@me/channels", fresh=fresh)
         except Exception as e:
-            print(f"✗ Failed to get DM channels: {e}")
+            log.error("✗ Failed to get DM channels: %s", e)
             return []
 
-    def search_messages_in_channel(self, channel_id: str, query: str, user_id: str = None, debug: bool = True, date_filter: Optional[str] = None, keywords: List[str] = None) -> List[Dict]:
+    def fetch_channel_messages(self, channel_id: str, lower: Optional[int] = None, upper: Optional[int] = None) -> List[MessageRecord]:
+        """Fetch messages with lower <= ID < upper from a channel
+
+        With a lower bound the channel is paginated forwards with `after` until
+        the window is covered. Without one only the newest page is fetched.
+        Each page is projected onto MessageRecords as soon as it is decoded.
+        """
+        params = {"limit": MESSAGES_PAGE_SIZE}
+        if lower is None:
+            if upper is not None:
+                params["before"] = str(upper)
+            response = self._request("GET", f"/channels/{channel_id}/messages", params=params)
+            response.raise_for_status()
+            with self.profiler.span("decode", bytes=len(response.content)):
+                return [MessageRecord.from_api(msg, channel_id) for msg in decode_json(response)]
+
+        messages = []
+        try:
+            for page, _ in self.iter_message_pages(channel_id, lower, upper):
+                messages.extend(page)
+        except DeadlineExceeded:
+            if not messages:
+                raise
+            # Pages are fetched oldest first, so the checkpoint can safely
+            # advance over what was fetched; the rest is picked up next run
+            log.warning("  ⚠ Run time budget spent, stopping after %s message(s) in this channel", len(messages))
+        return messages
+
+    def iter_message_pages(self, channel_id: str, lower: int, upper: Optional[int] = None) -> Iterator[Tuple[List[MessageRecord], int]]:
+        """Lazily page forwards through a channel's messages with lower <= ID < upper
+
+        Yields (messages, cursor) per page, oldest page first, where cursor is
+        the newest message ID the page reached. Resuming with lower=cursor + 1
+        continues where the page left off.
+        """
+        if upper is not None and lower >= upper:
+            return
+
+        params = {"limit": MESSAGES_PAGE_SIZE}
+        cursor = lower - 1
+        while True:
+            params["after"] = str(cursor)
+            response = self._request("GET", f"/channels/{channel_id}/messages", params=params)
+            response.raise_for_status()
+            with self.profiler.span("decode", bytes=len(response.content)):
+                page = decode_json(response)
+                messages = []
+                for msg in page:
+                    message_id = int(msg['id'])
+                    cursor = max(cursor, message_id)
+                    if upper is None or message_id < upper:
+                        messages.append(MessageRecord.from_api(msg, channel_id))
+            if not page:
+                return
+            yield messages, cursor
+
+            if len(page) < MESSAGES_PAGE_SIZE or (upper is not None and cursor >= upper - 1):
+                return
+
+    def search_messages_in_channel(self, channel_id: str, query: str, user_id: str = None, debug: bool = True, date_filter: Optional[str] = None, keywords: List[str] = None) -> List[MessageRecord]:
         """Search for messages in a specific channel
 
         Args:
             keywords: List of keywords to search for (case-insensitive)
         """
+        return [msg for msg, _ in self.scan_channel(channel_id, user_id=user_id, debug=debug, date_filter=date_filter, keywords=keywords)]
+
+    def _resume_lower(self, key: str, lower: Optional[int], upper: Optional[int]) -> Tuple[Optional[int], bool]:
+        """Raise a window's lower bound past the checkpoint stored under key
+
+        Only a checkpoint inside [lower, upper) is used, so a window entirely
+        before it (e.g. an explicit past date) is read in full. Returns the
+        lower bound and whether the checkpoint was applied.
+        """
+        checkpoint = self.checkpoints.get(key)
+        if checkpoint is None or (lower is not None and checkpoint < lower) or (upper is not None and checkpoint >= upper):
+            return lower, False
+        return checkpoint + 1, True
+
+    def scan_channel(self, channel_id: str, user_id: str = None, debug: bool = True, date_filter: Optional[str] = None, keywords: List[str] = None, rules: Optional[RuleSet] = None) -> List[Tuple[MessageRecord, List[str]]]:
+        """Fetch a channel's messages and evaluate every rule against them in one pass
+
+        When the channel's checkpoint lies inside the requested window, only
+        messages newer than it are fetched; a window entirely before the
+        checkpoint (e.g. an explicit past date) is fetched in full. The newest
+        fetched message ID is staged on self.checkpoints; callers commit it once
+        the returned messages have been handled.
+
+        Args:
+            keywords: List of keywords to search for (case-insensitive), used
+                     when no rules are given
+            rules: Compiled rules to evaluate; defaults to the run's rules, or a
+                  single rule built from keywords and user_id
+
+        Returns:
+            (message, emojis to react with) for every matching message
+        """
         messages = []
+        previews = []
 
-        # Default keywords if not provided
-        if keywords is None:
-            keywords = ["birthday"]
+        if rules is None:
+            rules = self.rules or self.build_rules(user_id, keywords, date_filter)
 
         try:
-            # Fetch recent messages (last 100)
-            response = requests.get(
-                f"{self.base_url}/channels/{channel_id}/messages",
-                headers=self.headers,
-                params={"limit": 100}
-            )
-            response.raise_for_status()
-            all_messages = response.json()
+            # Fetch only the snowflake range the rules' date windows cover
+            window = rules.window
+
+            lower, upper = window if window else (None, None)
+            lower, resumed = self._resume_lower(channel_id, lower, upper)
+
+            with self.profiler.span("fetch_messages", channel_id=channel_id):
+                all_messages = self.fetch_channel_messages(channel_id, lower=lower, upper=upper)
+            self.metrics.increment("messages_scanned", len(all_messages))
+
+            if all_messages:
+                self.checkpoints.stage(channel_id, max(int(msg.id) for msg in all_messages))
 
             if debug:
-                print(f"  ℹ Fetched {len(all_messages)} messages from channel")
-                print(f"  ℹ Searching for keywords: {', '.join(keywords)}")
-
-            # Parse date filter if provided
-            target_date = None
-            if date_filter:
-                if date_filter.lower() == "today":
-                    target_date = datetime.now(timezone.utc).date()
+                if resumed:
+                    log.info("  ℹ Fetched %s new message(s) since last run", len(all_messages))
                 else:
-                    try:
-                        target_date = datetime.fromisoformat(date_filter).date()
-                    except Exception as e:
-                        print(f"  ⚠ Invalid date format: {date_filter}, expected YYYY-MM-DD or 'today'")
+                    log.info("  ℹ Fetched %s messages from channel", len(all_messages))
+                log.debug("  ℹ Searching for keywords: %s", ', '.join(rules.keywords))
+                if window and date_filter:
+                    log.debug("  ℹ Filtering messages from: %s", date_filter)
 
-                if target_date and debug:
-                    print(f"  ℹ Filtering messages from: {target_date}")
+            # Previews are only built when debug output is actually logged
+            show_previews = debug and log.isEnabledFor(logging.DEBUG)
 
             birthday_messages = []
             # Filter messages containing any of the keywords and mentioning the user
-            for msg in all_messages:
-                content = msg.get('content', '')
-                content_lower = content.lower()
-
-                # Check if message contains any of the keywords
-                contains_keyword = False
-                matched_keyword = None
-                for keyword in keywords:
-                    if keyword.lower() in content_lower:
-                        contains_keyword = True
-                        matched_keyword = keyword
-                        break
+            with self.profiler.span("filter", messages=len(all_messages)):
+                for msg in all_messages:
+                    emojis, matched_keyword = rules.evaluate(msg)
+                    if matched_keyword is None:
+                        continue
 
-                if not contains_keyword:
-                    continue
+                    birthday_messages.append(msg)
+
+                    if emojis:
+                        messages.append((msg, emojis))
+                        if show_previews:
+                            previews.append((matched_keyword, msg.content))
 
-                # Check date filter if specified
-                if target_date:
-                    timestamp = msg.get('timestamp')
-                    if timestamp:
-                        try:
-                            msg_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).date()
-                            if msg_date != target_date:
-                                continue  # Skip messages not from target date
-                        except Exception as e:
-                            print(f"  ⚠ Failed to parse timestamp: {e}")
-                            continue
-
-                birthday_messages.append(msg)
-
-                # Check if user is mentioned in the message
-                user_mentioned = False
-
-                # Method 1: Check mentions array
-                mentions = msg.get('mentions', [])
-                if user_id:
-                    for mention in mentions:
-                        if mention.get('id') == user_id:
-                            user_mentioned = True
-                            break
-
-                # Method 2: Check for plain text "Hieu Le"
-                if 'hieu le' in content_lower:
-                    user_mentioned = True
-
-                # Method 3: Check for Discord mention format <@user_id>
-                if user_id and f'<@{user_id}>' in content:
-                    user_mentioned = True
-                if user_id and f'<@!{user_id}>' in content:  # Nickname mention format
-                    user_mentioned = True
-
-                if user_mentioned:
-                    if debug:
-                        # Show preview of matching message
+            self.metrics.increment("matches", len(messages))
+
+            # Show preview of matching messages
+            if previews:
+                with self.profiler.span("debug_output"):
+                    for matched_keyword, content in previews:
                         preview = content[:100] + '...' if len(content) > 100 else content
-                        print(f"  ✓ Match (keyword: '{matched_keyword}'): '{preview}'")
-                    messages.append(msg)
+                        log.debug("  ✓ Match (keyword: '%s'): '%s'", matched_keyword, preview)
 
             # Show debug info about birthday messages
-            if debug and birthday_messages and not messages:
-                print(f"  ⚠ Found {len(birthday_messages)} message(s) with keywords but NONE mention you")
-                print(f"  ℹ Showing first few messages:")
+            if show_previews and birthday_messages and not messages:
+                log.debug("  ⚠ Found %s message(s) with keywords but NONE mention you", len(birthday_messages))
+                log.debug("  ℹ Showing first few messages:")
                 for i, msg in enumerate(birthday_messages[:3]):
-                    content = msg.get('content', '')
+                    content = msg.content
                     preview = content[:150] + '...' if len(content) > 150 else content
-                    mentions = msg.get('mentions', [])
-                    mention_names = [m.get('username', 'Unknown') for m in mentions]
-                    print(f"    {i+1}. '{preview}'")
-                    if mentions:
-                        print(f"       Mentions: {', '.join(mention_names)}")
+                    log.debug("    %s. '%s'", i + 1, preview)
+                    if msg.mentions:
+                        log.debug("       Mentions: %s", ", ".join(f"<@{mention}>" for mention in msg.mentions))
                     else:
-                        print(f"       Mentions: (none)")
+                        log.debug("       Mentions: (none)")
 
-            time.sleep(1)  # Rate limiting
             return messages
 
         except Exception as e:
-            print(f"  ✗ Failed to search messages in channel {channel_id}: {e}")
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code in (403, 404):
+                # Lost access or channel deleted, cached listings are stale
+                self.metadata.invalidate_channel(channel_id)
+            log.error("  ✗ Failed to search messages in channel %s: %s", channel_id, e)
             return []
 
-    def search_messages_in_guild(self, guild_id: str) -> List[Dict]:
-        """Search for messages in a guild using Discord's search API"""
-        messages = []
+    def search_messages_in_guild(self, guild_id: str, keywords: List[str] = None, user_id: Optional[str] = None, date_filter: Optional[str] = None) -> List[MessageRecord]:
+        """Search for messages in a guild using Discord's search API
+
+        Runs one query per keyword, bounded by the date window through
+        min_id/max_id, and follows offset pagination until total_results is
+        covered. Like channel scans, only hits newer than the guild's search
+        checkpoint are requested, and without a date window or checkpoint only
+        the newest page of each query is read; the newest hit is staged under
+        search_checkpoint_key(guild_id) once every query completed. When
+        user_id is given the queries are narrowed to messages mentioning it, so
+        leave it out when plain-text aliases must also match. Results still
+        need to pass the rules.
+        """
+        if keywords is None:
+            keywords = ["birthday"]
+
+        base_params = {"include_nsfw": "true", "sort_by": "timestamp", "sort_order": "desc"}
+        checkpoint_key = self.search_checkpoint_key(guild_id)
+        lower, upper = self._date_window(date_filter) or (None, None)
+        lower, _ = self._resume_lower(checkpoint_key, lower, upper)
+        if lower is not None:
+            base_params["min_id"] = str(lower - 1)
+        if upper is not None:
+            base_params["max_id"] = str(upper)
+        if user_id:
+            base_params["mentions"] = user_id
+
+        messages: Dict[str, MessageRecord] = {}
         try:
-            # Use Discord's native search endpoint for guilds
-            response = requests.get(
-                f"{self.base_url}/guilds/{guild_id}/messages/search",
-                headers=self.headers,
-                params={
-                    "content": "birthday Hieu Le",
-                    "include_nsfw": "true"
-                }
-            )
+            # Without a lower bound pagination could run to MAX_SEARCH_OFFSET
+            max_offset = MAX_SEARCH_OFFSET if lower is not None else 0
+            for keyword in keywords:
+                offset = 0
+                while offset <= max_offset:
+                    data = self._search_guild_page(guild_id, dict(base_params, content=keyword, offset=offset))
+                    if data is None:
+                        return list(messages.values())
+
+                    results = data.get('messages', [])
+                    for result in results:
+                        # Each result is an array of messages; the hit is flagged
+                        # when surrounding context messages are included
+                        hits = result if isinstance(result, list) else [result]
+                        for msg in hits:
+                            if (len(hits) == 1 or msg.get('hit')) and msg['id'] not in messages:
+                                messages[msg['id']] = MessageRecord.from_api(msg)
+
+                    offset += len(results)
+                    if not results or offset >= data.get('total_results', 0):
+                        break
+
+            if messages:
+                self.checkpoints.stage(checkpoint_key, max(int(message_id) for message_id in messages))
+            return list(messages.values())
+
+        except Exception as e:
+            log.error("  ✗ Failed to search in guild %s: %s", guild_id, e)
+            return list(messages.values())
+
+    @staticmethod
+    def search_checkpoint_key(guild_id: str) -> str:
+        """Checkpoint key for a guild's search results (channel IDs key channel scans)"""
+        return f"search:{guild_id}"
+
+    def _search_guild_page(self, guild_id: str, params: Dict) -> Optional[Dict]:
+        """Fetch one page of guild search results, waiting while the index warms up
+
+        Returns None when the guild cannot be searched.
+        """
+        for attempt in range(SEARCH_INDEX_RETRIES + 1):
+            response = self._request("GET", f"/guilds/{guild_id}/messages/search", params=params)
 
             if response.status_code == 200:
-                data = response.json()
-                # Extract messages from search results
-                for result in data.get('messages', []):
-                    # Each result is an array of messages
-                    if isinstance(result, list):
-                        messages.extend(result)
-                    else:
-                        messages.append(result)
+                with self.profiler.span("decode", bytes=len(response.content)):
+                    return decode_json(response)
+            elif response.status_code == 202:
+                # Search index is still being built for this guild
+                retry_after = response.json().get('retry_after')
+                retry_after = 2.0 if retry_after is None else float(retry_after)
+                if attempt < SEARCH_INDEX_RETRIES:
+                    if not self._can_wait(retry_after):
+                        raise DeadlineExceeded(f"GET /guilds/{guild_id}/messages/search")
+                    self.metrics.increment("retries")
+                    self.metrics.increment("search_index_retries")
+                    log.info("  ℹ Search index not ready, retrying in %ss...", retry_after)
+                    time.sleep(retry_after)
+                continue
             elif response.status_code == 403:
-                print(f"  ⚠ No search permission in this guild")
+                log.warning("  ⚠ No search permission in this guild")
+            elif response.status_code == 404:
+                # Guild no longer accessible, cached listings are stale
+                self.metadata.invalidate("guilds")
+                self.metadata.invalidate(f"channels:{guild_id}")
+                log.warning("  ⚠ Guild not found")
             else:
-                print(f"  ⚠ Search returned status {response.status_code}")
+                log.warning("  ⚠ Search returned status %s", response.status_code)
+            return None
 
-            time.sleep(1)
-            return messages
+        log.warning("  ⚠ Search index still not ready after %s retries", SEARCH_INDEX_RETRIES)
+        return None
 
-        except Exception as e:
-            print(f"  ✗ Failed to search in guild {guild_id}: {e}")
-            return []
+    def add_reaction(self, channel_id: str, message_id: str, emoji: Union[Emoji, str]) -> Optional[bool]:
+        """Add a reaction to a message
 
-    def add_reaction(self, channel_id: str, message_id: str, emoji: str) -> bool:
-        """Add a reaction to a message"""
+        Returns True once added, False on a failure worth retrying later (rate
+        limits, server and connection errors, an open circuit) and None when
+        Discord rejected it for good, e.g. missing permissions or a deleted message.
+        """
         try:
-            # URL encode the emoji
-            encoded_emoji = quote(emoji)
-            url = f"{self.base_url}/channels/{channel_id}/messages/{message_id}/reactions/{encoded_emoji}/@me"
+            if isinstance(emoji, str):
+                emoji = self.emojis.get(emoji)
+            path = f"/channels/{channel_id}/messages/{message_id}/reactions/{emoji.route}/@me"
 
-            response = requests.put(url, headers=self.headers)
+            # Matches already found are reacted to even once the run's time budget is spent
+            response = self._request("PUT", path, deadline=False)
 
             if response.status_code == 204:
                 return True
             elif response.status_code == 429:
-                # Rate limited
-                retry_after = response.json().get('retry_after', 2)
-                print(f"  ⚠ Rate limited, waiting {retry_after}s...")
-                time.sleep(retry_after)
+                log.error("  ✗ Still rate limited after %s retries", self.max_retries)
                 return False
+            elif 400 <= response.status_code < 500:
+                log.error("  ✗ Reaction rejected: %s", response.status_code)
+                return None
             else:
-                print(f"  ✗ Failed to add reaction: {response.status_code}")
+                log.error("  ✗ Failed to add reaction: %s", response.status_code)
                 return False
 
         except Exception as e:
-            print(f"  ✗ Error adding reaction: {e}")
+            log.error("  ✗ Error adding reaction: %s", e)
             return False
 
-    def get_message(self, channel_id: str, message_id: str) -> Optional[Dict]:
+    def get_message(self, channel_id: str, message_id: str) -> Optional[MessageRecord]:
         """Get a specific message with its reactions"""
         try:
-            response = requests.get(
-                f"{self.base_url}/channels/{channel_id}/messages/{message_id}",
-                headers=self.headers
-            )
+            response = self._request("GET", f"/channels/{channel_id}/messages/{message_id}")
             response.raise_for_status()
-            return response.json()
+            return MessageRecord.from_api(decode_json(response), channel_id)
         except Exception as e:
-            print(f"  ✗ Failed to get message: {e}")
+            log.error("  ✗ Failed to get message: %s", e)
             return None
 
-    def check_user_reactions(self, message: Dict, user_id: str) -> Dict[str, bool]:
-        """Check which reactions the user has already added to a message"""
-        user_reactions = {}
-
-        for emoji_name, emoji in self.emojis.items():
-            user_reactions[emoji_name] = False
-
-        reactions = message.get('reactions', [])
-        for reaction in reactions:
-            emoji = reaction.get('emoji', {})
-            emoji_name_or_id = emoji.get('name')
-
-            # Check if this is one of our emojis
-            for our_emoji_name, our_emoji in self.emojis.items():
-                if emoji_name_or_id == our_emoji:
-                    # Check if current user reacted
-                    if reaction.get('me', False):
-                        user_reactions[our_emoji_name] = True
-                    break
+    def check_user_reactions(self, message: MessageRecord, user_id: str) -> Set[str]:
+        """Return the keys of the configured emojis the user has already added to a message"""
+        return message.reactions & self.emojis.by_key.keys()
 
-        return user_reactions
+    def plan_reactions(self, channel_id: str, message_id: str, message: Optional[MessageRecord] = None, user_id: Optional[str] = None, confirmed: Optional[Set[str]] = None, emojis: Optional[List[str]] = None) -> Optional[List[Emoji]]:
+        """Return the reactions still missing from a message
 
-    def react_to_message(self, channel_id: str, message_id: str, message_link: str, message: Optional[Dict] = None, user_id: Optional[str] = None):
-        """Add all three reactions to a message, skipping ones already added"""
-        print(f"\n  → Processing: {message_link}")
+        Only emojis in `emojis` (the matching rules' emojis) are planned; all
+        configured emojis when omitted. Returns None if the message could not
+        be retrieved.
+        """
+        targets = self.emojis.select(emojis)
+
+        # Consult the ledger before any network call
+        if confirmed is None:
+            confirmed = self.ledger.lookup([message_id]).get(message_id, set())
+        missing = targets.keys() - confirmed
+        if not missing:
+            log.debug("    ℹ Already reacted with all emojis (ledger) - skipping")
+            self.metrics.increment("reactions_skipped", len(targets))
+            return []
 
         # Get message if not provided
         if message is None:
             message = self.get_message(channel_id, message_id)
             if message is None:
-                print(f"    ✗ Could not retrieve message")
-                return
+                log.error("    ✗ Could not retrieve message")
+                return None
 
         # Check existing reactions if we have user_id
         if user_id:
-            existing_reactions = self.check_user_reactions(message, user_id)
-            all_reacted = all(existing_reactions.values())
+            with self.profiler.span("check_user_reactions"):
+                reacted = self.check_user_reactions(message, user_id) & missing
+            for key in reacted:
+                self.ledger.record(message_id, key)
+            missing -= reacted
 
-            if all_reacted:
-                print(f"    ℹ Already reacted with all emojis - skipping")
-                return
+            if not missing:
+                log.debug("    ℹ Already reacted with all emojis - skipping")
+                self.metrics.increment("reactions_skipped", len(targets))
+                return []
 
             # Show which reactions already exist
-            already_added = [name for name, exists in existing_reactions.items() if exists]
+            already_added = len(targets) - len(missing)
             if already_added:
-                print(f"    ℹ Already have: {', '.join(already_added)}")
-        else:
-            existing_reactions = {name: False for name in self.emojis.keys()}
+                log.debug("    ℹ Already have: %s", ', '.join(emoji.text for key, emoji in targets.items() if key not in missing))
+                self.metrics.increment("reactions_skipped", already_added)
+
+        return [emoji for key, emoji in targets.items() if key in missing]
 
-        # Add missing reactions
-        added_count = 0
-        for emoji_name, emoji in self.emojis.items():
-            if existing_reactions.get(emoji_name, False):
-                continue  # Skip already added reactions
+    def apply_reaction(self, channel_id: str, message_id: str, emoji: Emoji) -> bool:
+        """Add one planned reaction and record the outcome
 
+        Returns False only if the reaction should be tried again on a later
+        run; reactions Discord rejected for good count as settled.
+        """
+        with self.profiler.span("add_reaction", message_id=message_id):
             success = self.add_reaction(channel_id, message_id, emoji)
-            if success:
-                print(f"    ✓ Added {emoji_name} {emoji}")
-                added_count += 1
-            else:
-                print(f"    ✗ Failed to add {emoji_name} {emoji}")
+        if success is None:
+            self.metrics.increment("reactions_rejected")
+            log.warning("    ⚠ Discord rejected %s %s on message %s, not retrying", emoji.name, emoji.text, message_id,
+                        extra={"event": "reaction_rejected", "channel_id": channel_id, "message_id": message_id, "emoji": emoji.text})
+            return True
+        if success:
+            self.ledger.record(message_id, emoji.key)
+            self.metrics.increment("reactions_added")
+            log.debug("    ✓ Added %s %s to message %s", emoji.name, emoji.text, message_id,
+                      extra={"event": "reaction_added", "channel_id": channel_id, "message_id": message_id, "emoji": emoji.text})
+        else:
+            self.metrics.increment("reactions_failed")
+            log.error("    ✗ Failed to add %s %s to message %s", emoji.name, emoji.text, message_id,
+                      extra={"event": "reaction_failed", "channel_id": channel_id, "message_id": message_id, "emoji": emoji.text})
+        return success
 
-            # Random delay between configured min and max seconds
-            import random
-            delay = random.uniform(self.delay_min, self.delay_max)
-            time.sleep(delay)
+    def react_to_message(self, channel_id: str, message_id: str, message_link: str, message: Optional[MessageRecord] = None, user_id: Optional[str] = None, confirmed: Optional[Set[str]] = None, emojis: Optional[List[str]] = None, tracker: Optional[CommitTracker] = None):
+        """Add the configured reactions to a message, skipping ones already added
 
-        if added_count == 0 and not all(existing_reactions.values()):
-            print(f"    ⚠ No new reactions added")
+        While a reaction pipeline is running the missing reactions are queued
+        on it and this returns immediately; otherwise they are added inline.
+
+        Args:
+            confirmed: Emojis the ledger already has for this message, when the
+                      caller looked them up in bulk. Looked up here if omitted.
+            emojis: Emojis of the rules the message matched; all configured
+                   emojis if omitted
+            tracker: Holds the caller's checkpoint or backfill progress back
+                    until the reactions are confirmed
+        """
+        with self.profiler.span("react_to_message", message_id=message_id):
+            log.info("\n  → Processing: %s", message_link)
 
-    def process_guild(self, guild: Dict, user_id: str):
+            if tracker is not None and not tracker.hold(message_id):
+                log.debug("    ℹ Reactions already queued - skipping")
+                return
+            release = tracker.release if tracker is not None else (lambda message_id, ok: None)
+
+            try:
+                missing = self.plan_reactions(channel_id, message_id, message=message, user_id=user_id, confirmed=confirmed, emojis=emojis)
+                if not missing:
+                    release(message_id, missing is not None)
+                    return
+
+                if self.pipeline is not None:
+                    self.pipeline.submit(ReactionWork(channel_id, message_id, missing, on_done=lambda ok: release(message_id, ok)))
+                    return
+            except BaseException:
+                release(message_id, False)
+                raise
+
+            # Add missing reactions
+            settled = 0
+            try:
+                for emoji in missing:
+                    if self.apply_reaction(channel_id, message_id, emoji):
+                        settled += 1
+
+                    # Random delay between configured min and max seconds
+                    time.sleep(random.uniform(self.delay_min, self.delay_max))
+            finally:
+                release(message_id, settled == len(missing))
+
+            if settled == 0:
+                log.warning("    ⚠ No new reactions added")
+
+    def process_guild(self, guild: Dict, user_id: str, date_filter: Optional[str] = None, keywords: List[str] = None):
         """Process all channels in a guild"""
-        guild_id = guild['id']
-        guild_name = guild['name']
-        print(f"\n📁 Searching in guild: {guild_name}")
+        with self.profiler.span("process_guild", guild_id=guild['id']):
+            guild_id = guild['id']
+            guild_name = guild['name']
+            log.info("\n📁 Searching in guild: %s", guild_name)
+
+            rules = self.rules or self.build_rules(user_id, keywords, date_filter)
+
+            # One paginated guild-wide search covers every channel and rule
+            messages = self.search_messages_in_guild(
+                guild_id,
+                keywords=rules.keywords,
+                user_id=rules.search_mention,
+                date_filter=date_filter
+            )
+
+            self.metrics.increment("messages_scanned", len(messages))
+            checkpoint_key = self.search_checkpoint_key(guild_id)
+            if messages:
+                log.info("  ✓ Found %s matching message(s)", len(messages))
+                tracker = self.checkpoints.tracker(checkpoint_key)
+                confirmed = self.ledger.lookup([msg.id for msg in messages])
+                for msg in messages:
+                    try:
+                        channel_id = msg.channel_id
+                        message_id = msg.id
+                        message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+
+                        # Check if message matches any rule
+                        emojis, _ = rules.evaluate(msg)
+                        if emojis:
+                            self.metrics.increment("matches")
+                            self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id, confirmed=confirmed.get(message_id, set()), emojis=emojis, tracker=tracker)
+                    except Exception as e:
+                        log.error("  ✗ Error processing message: %s", e)
+            else:
+                log.info("  ℹ No matching messages found")
 
-        # Try guild-wide search first
-        messages = self.search_messages_in_guild(guild_id)
+            self.checkpoints.commit(checkpoint_key)
 
-        if messages:
-            print(f"  ✓ Found {len(messages)} matching message(s)")
-            for msg in messages:
-                try:
-                    channel_id = msg['channel_id']
-                    message_id = msg['id']
-                    message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+    def is_channel_active(self, channel: Dict, window_lower: Optional[int] = None, window_upper: Optional[int] = None) -> bool:
+        """Check from a channel's last_message_id whether it may have messages to scan
 
-                    # Check if message mentions "Hieu Le"
-                    content = msg.get('content', '')
-                    if 'hieu le' in content.lower() and 'birthday' in content.lower():
-                        self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id)
-                except Exception as e:
-                    print(f"  ✗ Error processing message: {e}")
-        else:
-            print(f"  ℹ No matching messages found")
+        A channel is inactive when it has no messages, nothing since the start
+        of the date window, or nothing newer than its checkpoint while the
+        checkpoint lies inside the window (see scan_channel). The listing has
+        to be fetched fresh: a cached last_message_id cannot show that nothing
+        arrived since it was stored.
+        """
+        last_message_id = channel.get('last_message_id')
+        if not last_message_id:
+            return False
+        last_message_id = int(last_message_id)
+
+        checkpoint = self.checkpoints.get(channel['id'])
+        if checkpoint is not None and last_message_id <= checkpoint and (window_upper is None or checkpoint < window_upper):
+            return False
+        if window_lower is not None and last_message_id < window_lower:
+            return False
+        return True
+
+    def select_active_channels(self, channels: List[Dict], date_filter: Optional[str] = None, channel_types: Optional[Set[int]] = None) -> List[Dict]:
+        """Filter a channel listing down to the channels worth scanning
 
-    def process_dm_channels(self, user_id: str):
+        Args:
+            channel_types: Only keep channels of these types (e.g. TEXT_CHANNEL_TYPES)
+        """
+        window = self._date_window(date_filter)
+        window_lower, window_upper = window if window else (None, None)
+
+        if channel_types is not None:
+            channels = [channel for channel in channels if channel.get('type') in channel_types]
+        active = [channel for channel in channels if self.is_channel_active(channel, window_lower, window_upper)]
+        if len(active) < len(channels):
+            log.info("  ℹ Skipping %s inactive channel(s)", len(channels) - len(active))
+
+        # Newest activity first, so a run cut short by its time budget covers the busiest channels
+        active.sort(key=lambda channel: int(channel['last_message_id']), reverse=True)
+        return active
+
+    def discover_guild_channels(self, guild: Dict, date_filter: Optional[str] = None) -> List[Dict]:
+        """List a guild's text channels that have activity worth scanning"""
+        log.info("\n📁 Discovering channels in guild: %s", guild['name'])
+        return self.select_active_channels(self.get_channels(guild['id'], fresh=True), date_filter, TEXT_CHANNEL_TYPES)
+
+    def process_dm_channels(self, user_id: str, date_filter: Optional[str] = None):
         """Process DM channels"""
-        print(f"\n💬 Searching in DM channels...")
-        dm_channels = self.get_dm_channels()
+        with self.profiler.span("process_dm_channels"):
+            log.info("\n💬 Searching in DM channels...")
+            dm_channels = self.select_active_channels(self.get_dm_channels(fresh=True), date_filter)
+
+            for channel in dm_channels:
+                self.process_dm_channel(channel, user_id, date_filter=date_filter)
 
-        for channel in dm_channels:
+    def process_dm_channel(self, channel: Dict, user_id: str, date_filter: Optional[str] = None):
+        """Process a single DM channel"""
+        with self.profiler.span("process_dm_channel", channel_id=channel['id']):
             channel_id = channel['id']
-            channel_type = channel.get('type')
 
             # Get recipient name
             recipients = channel.get('recipients', [])
             recipient_names = ', '.join([r.get('username', 'Unknown') for r in recipients])
 
-            print(f"\n  Searching DM with: {recipient_names}")
-            messages = self.search_messages_in_channel(channel_id, "birthday Hieu Le")
+            log.info("\n  Searching DM with: %s", recipient_names)
+            matches = self.scan_channel(channel_id, user_id=user_id, date_filter=date_filter)
 
-            if messages:
-                print(f"  ✓ Found {len(messages)} matching message(s)")
-                for msg in messages:
-                    message_id = msg['id']
+            if matches:
+                log.info("  ✓ Found %s matching message(s)", len(matches))
+                confirmed = self.ledger.lookup([msg.id for msg, _ in matches])
+                for msg, emojis in matches:
+                    message_id = msg.id
                     message_link = f"https://discord.com/channels/@me/{channel_id}/{message_id}"
-                    self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id)
+                    self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id, confirmed=confirmed.get(message_id, set()), emojis=emojis, tracker=self.checkpoints.tracker(channel_id))
             else:
-                print(f"  ℹ No matching messages found")
+                log.info("  ℹ No matching messages found")
+
+            self.checkpoints.commit(channel_id)
 
     def parse_channel_link(self, link: str) -> Optional[tuple]:
         """Parse a Discord channel link to extract guild_id and channel_id"""
@@ -423,35 +2583,119 @@ class DiscordReactor:
                     channel_id = parts[idx + 2].split('?')[0]  # Remove query params if any
                     return (guild_id, channel_id)
         except Exception as e:
-            print(f"✗ Failed to parse link: {e}")
+            log.error("✗ Failed to parse link: %s", e)
         return None
 
-    def process_specific_channel(self, guild_id: str, channel_id: str, user_id: str, date_filter: Optional[str] = None, keywords: List[str] = None):
-        """Process a specific channel"""
-        print(f"\n📁 Searching in channel: {channel_id}")
-
-        messages = self.search_messages_in_channel(
-            channel_id,
-            "birthday Hieu Le",
-            user_id=user_id,
-            debug=True,
-            date_filter=date_filter,
-            keywords=keywords
-        )
+    def order_channel_links(self, targets: List[tuple]) -> List[tuple]:
+        """Order (guild_id, channel_id) link targets newest activity first
 
-        if messages:
-            print(f"\n  ✓ Found {len(messages)} matching message(s)")
-            for msg in messages:
-                message_id = msg['id']
-                if guild_id == "@me":
-                    message_link = f"https://discord.com/channels/@me/{channel_id}/{message_id}"
-                else:
-                    message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
-                self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id)
-        else:
-            print(f"  ℹ No matching messages found")
+        A channel's activity is the newer of its last_message_id in the cached
+        listing and its checkpoint. Channels with neither have never been
+        scanned and go first. The cached listings are only used for ordering,
+        so a stale one can misplace a channel but never skips it.
+        """
+        listings = {}
+        for guild_id, _ in targets:
+            if guild_id not in listings:
+                listings[guild_id] = self.get_dm_channels() if guild_id == "@me" else self.get_channels(guild_id)
+        last_message_ids = {
+            channel['id']: int(channel['last_message_id'])
+            for channels in listings.values() for channel in channels
+            if channel.get('last_message_id')
+        }
+
+        def activity(target: tuple) -> float:
+            _, channel_id = target
+            known = [value for value in (last_message_ids.get(channel_id), self.checkpoints.latest(channel_id)) if value is not None]
+            return max(known) if known else float("inf")
+
+        return sorted(targets, key=activity, reverse=True)
+
+    def process_specific_channel(self, guild_id: str, channel_id: str, user_id: str, date_filter: Optional[str] = None, keywords: List[str] = None) -> int:
+        """Process a specific channel and return the number of matching messages"""
+        with self.profiler.span("process_channel", channel_id=channel_id):
+            log.info("\n📁 Searching in channel: %s", channel_id)
+
+            matches = self.scan_channel(
+                channel_id,
+                user_id=user_id,
+                debug=True,
+                date_filter=date_filter,
+                keywords=keywords
+            )
+
+            if matches:
+                log.info("\n  ✓ Found %s matching message(s)", len(matches),
+                         extra={"event": "matches_found", "channel_id": channel_id, "matches": len(matches)})
+                confirmed = self.ledger.lookup([msg.id for msg, _ in matches])
+                for msg, emojis in matches:
+                    message_id = msg.id
+                    if guild_id == "@me":
+                        message_link = f"https://discord.com/channels/@me/{channel_id}/{message_id}"
+                    else:
+                        message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+                    self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id, confirmed=confirmed.get(message_id, set()), emojis=emojis, tracker=self.checkpoints.tracker(channel_id))
+            else:
+                log.info("  ℹ No matching messages found")
+
+            self.checkpoints.commit(channel_id)
+            return len(matches)
+
+    def start_pipeline(self):
+        """Start a reaction pipeline so react_to_message queues instead of blocking"""
+        if self.pipeline is None:
+            self.pipeline = ReactionPipeline(
+                self.apply_reaction,
+                workers=self.reaction_workers,
+                channel_queue_size=self.reaction_queue_size,
+                delay_min=self.delay_min,
+                delay_max=self.delay_max
+            )
+            self.pipeline.start()
+
+    def stop_pipeline(self):
+        """Wait for queued reactions to finish and stop the pipeline"""
+        if self.pipeline is not None:
+            pending = self.pipeline.pending
+            if pending:
+                log.info("\nℹ  Waiting for %s queued reaction(s)...", pending)
+            self.pipeline.close()
+            self.pipeline = None
+
+    def deadline_passed(self) -> bool:
+        """Whether the run's time budget is spent"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    async def run_jobs(self, jobs: List[Callable[[], None]], concurrency: int):
+        """Run blocking scan jobs concurrently, at most `concurrency` at a time
+
+        Each job runs on a worker thread so independent channels and guilds make
+        progress in parallel; the shared RateLimiter keeps every route within its
+        limits regardless of how many jobs are in flight. Jobs still waiting when
+        the run's deadline passes are not started.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            await asyncio.gather(*(loop.run_in_executor(executor, self.run_job, job) for job in jobs))
 
-    def run(self, channel_links: Optional[List[str]] = None, date_filter: Optional[str] = None, keywords: List[str] = None):
+    def run_job(self, job: Callable[[], None]):
+        """Run one scan job, the same way sequentially and on run_jobs' workers
+
+        A job is not started once the run's deadline has passed, and one cut off
+        by it is counted as unfinished. Other errors are logged so the remaining
+        jobs still run.
+        """
+        if self.deadline_passed():
+            self.metrics.increment("jobs_unfinished")
+            return
+        try:
+            job()
+        except DeadlineExceeded:
+            self.metrics.increment("jobs_unfinished")
+        except Exception as e:
+            log.error("  ✗ Scan job failed: %s", e)
+
+    def run(self, channel_links: Optional[List[str]] = None, date_filter: Optional[str] = None, keywords: List[str] = None, concurrency: int = 1, time_budget: Optional[float] = None):
         """Main execution method
 
         Args:
@@ -462,70 +2706,534 @@ class DiscordReactor:
                         If not provided, searches all messages.
             keywords: List of keywords to search for in messages (case-insensitive).
                      Defaults to ["birthday"] if not provided.
+            concurrency: Number of channels/guilds to scan at once. With 1 (the
+                        default) everything is processed sequentially.
+            time_budget: Optional limit in seconds on the run's scanning. Once it
+                        is spent no new scan requests are sent; matches already
+                        found still get their reactions and partially scanned
+                        channels keep their checkpoints.
         """
-        print("=" * 60)
-        print("Discord Birthday Message Reactor")
-        print("=" * 60)
-        print("\n⚠  WARNING: This violates Discord's Terms of Service!")
-        print("   Use at your own risk.\n")
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+
+        log.info("=" * 60)
+        log.info("Discord Birthday Message Reactor")
+        log.info("=" * 60)
+        log.warning("\n⚠  WARNING: This violates Discord's Terms of Service!")
+        log.info("   Use at your own risk.\n")
 
         # Verify token and get user ID
+        with self.profiler.phase("login"):
+            user_id = self.get_user_id()
+        if not user_id:
+            log.error("\n✗ Failed to authenticate. Check your token.")
+            return
+
+        log.info("ℹ  Your user ID: %s\n", user_id)
+
+        # Compile the reaction rules once for the whole run
+        self.rules = self.build_rules(user_id, keywords, date_filter)
+        if self.rule_configs:
+            log.info("ℹ  Rules: %s", ", ".join(rule.name for rule in self.rule_configs))
+
+        jobs = []
+
+        with self.profiler.phase("discovery"):
+            try:
+                # If specific channel links provided, process only those
+                if channel_links:
+                    log.info("✓ Processing %s specific channel(s)", len(channel_links))
+                    if date_filter:
+                        log.info("ℹ  Date filter: %s", date_filter)
+                    if keywords:
+                        log.info("ℹ  Keywords: %s", ', '.join(keywords))
+                    targets = []
+                    for link in channel_links:
+                        parsed = self.parse_channel_link(link)
+                        if parsed:
+                            targets.append(parsed)
+                        else:
+                            log.error("✗ Invalid channel link: %s", link)
+                    # The order only matters when the time budget can cut the run short
+                    if self.deadline is not None:
+                        targets = self.order_channel_links(targets)
+                    for guild_id, channel_id in targets:
+                        jobs.append(lambda guild_id=guild_id, channel_id=channel_id: self.process_specific_channel(
+                            guild_id,
+                            channel_id,
+                            user_id,
+                            date_filter=date_filter,
+                            keywords=keywords
+                        ))
+                else:
+                    # Original behavior: search all guilds and DMs
+                    guilds = self.get_guilds()
+                    log.info("\n✓ Found %s guild(s)", len(guilds))
+
+                    # Process each guild, either with one guild-wide search or by
+                    # scanning each of its active text channels
+                    for guild in guilds:
+                        if self.guild_scan_mode == "channels":
+                            for channel in self.discover_guild_channels(guild, date_filter):
+                                jobs.append(lambda guild=guild, channel=channel: self.process_specific_channel(
+                                    guild['id'],
+                                    channel['id'],
+                                    user_id,
+                                    date_filter=date_filter,
+                                    keywords=keywords
+                                ))
+                        else:
+                            jobs.append(lambda guild=guild: self.process_guild(guild, user_id, date_filter=date_filter, keywords=keywords))
+
+                    # Process DM channels
+                    if concurrency > 1:
+                        log.info("\n💬 Searching in DM channels...")
+                        for channel in self.select_active_channels(self.get_dm_channels(fresh=True), date_filter):
+                            jobs.append(lambda channel=channel: self.process_dm_channel(channel, user_id, date_filter=date_filter))
+                    else:
+                        jobs.append(lambda: self.process_dm_channels(user_id, date_filter=date_filter))
+            except DeadlineExceeded:
+                log.warning("\n⚠  Run time budget spent during discovery")
+
+        # Reactions run in the background while scanning continues
+        self.start_pipeline()
+        try:
+            with self.profiler.phase("scan"):
+                if concurrency > 1:
+                    log.info("ℹ  Scanning with concurrency: %s", concurrency)
+                    asyncio.run(self.run_jobs(jobs, concurrency))
+                else:
+                    for job in jobs:
+                        self.run_job(job)
+        finally:
+            with self.profiler.phase("drain_reactions"):
+                self.stop_pipeline()
+            self.deadline = None
+
+        self.export_metrics()
+        summary = self.metrics.summary()
+        counters = summary["counters"]
+
+        log.info("\n" + "=" * 60)
+        log.info("✓ Completed!")
+        log.info("ℹ  %s request(s), %s message(s) scanned, %s reaction(s) added, %ss waiting on rate limits",
+                 summary['requests'], counters.get('messages_scanned', 0), counters.get('reactions_added', 0), summary['rate_limit_wait_seconds'],
+                 extra={"event": "run_summary", "requests": summary['requests'], "messages_scanned": counters.get('messages_scanned', 0),
+                        "reactions_added": counters.get('reactions_added', 0)})
+        if counters.get('jobs_unfinished'):
+            log.warning("⚠  Time budget of %gs spent: %s scan job(s) left for the next run", time_budget, counters['jobs_unfinished'])
+        if self.profiler.enabled:
+            log.info("ℹ  Time by span: %s", ", ".join(f"{name} {seconds}s ({count}x)" for name, count, seconds in self.profiler.summary()))
+        log.info("=" * 60)
+
+    def refresh_poll_targets(self, schedule: PollScheduler, channel_links: Optional[List[str]] = None, date_filter: Optional[str] = None):
+        """Add newly visible channels to the schedule and wake ones with new messages
+
+        Channel links are fixed; otherwise every guild text channel and DM is
+        scheduled from freshly fetched listings, whose last_message_id tells which
+        channels have activity since their checkpoint inside the date window.
+        """
+        if channel_links:
+            for link in channel_links:
+                parsed = self.parse_channel_link(link)
+                if parsed:
+                    schedule.add(*parsed)
+                else:
+                    log.error("✗ Invalid channel link: %s", link)
+            return
+
+        # Listings are fetched fresh so a changed last_message_id wakes idle channels
+        targets = []
+        for guild in self.get_guilds():
+            channels = self.get_channels(guild['id'], fresh=True)
+            targets.extend((guild['id'], channel) for channel in channels if channel.get('type') in TEXT_CHANNEL_TYPES)
+        targets.extend(("@me", channel) for channel in self.get_dm_channels(fresh=True))
+
+        window = self._date_window(date_filter)
+        window_lower, window_upper = window if window else (None, None)
+
+        seen = set()
+        for guild_id, channel in targets:
+            channel_id = channel['id']
+            seen.add(channel_id)
+            # Channels without messages in the window never get a checkpoint,
+            # so only the window keeps them from waking on every pass
+            active = self.is_channel_active(channel, window_lower, window_upper)
+            if channel_id not in schedule.intervals:
+                schedule.add(guild_id, channel_id, active=active)
+            elif active:
+                schedule.wake(channel_id)
+
+        # Channels we lost access to or that were deleted
+        for channel_id in list(schedule.intervals):
+            if channel_id not in seen:
+                schedule.remove(channel_id)
+
+    def poll_channel(self, schedule: PollScheduler, guild_id: str, channel_id: str, user_id: str, date_filter: Optional[str] = None, keywords: List[str] = None):
+        """Scan one scheduled channel and adapt its polling interval"""
+        before = self.checkpoints.latest(channel_id)
+        matches = self.process_specific_channel(guild_id, channel_id, user_id, date_filter=date_filter, keywords=keywords)
+        schedule.record(channel_id, new_messages=self.checkpoints.latest(channel_id) != before, matches=matches)
+
+    def daemon(self, channel_links: Optional[List[str]] = None, date_filter: Optional[str] = None, keywords: List[str] = None, concurrency: int = 1, min_interval: float = 30.0, max_interval: float = 1800.0, backoff: float = 2.0, discovery_interval: float = 600.0, metrics_interval: float = 60.0):
+        """Stay resident and poll each channel on its own adaptive interval
+
+        Login, discovery, rules and caches are set up once. Channels with recent
+        activity or matches are polled every min_interval; idle ones back off
+        exponentially to max_interval. Channel listings are refreshed every
+        discovery_interval to pick up new channels and wake active ones.
+
+        Args:
+            concurrency: Number of due channels scanned at once.
+            metrics_interval: Seconds between metrics file exports.
+        """
+        log.info("=" * 60)
+        log.info("Discord Birthday Message Reactor (daemon mode)")
+        log.info("=" * 60)
+        log.warning("\n⚠  WARNING: This violates Discord's Terms of Service!")
+        log.info("   Use at your own risk.\n")
+
         user_id = self.get_user_id()
         if not user_id:
-            print("\n✗ Failed to authenticate. Check your token.")
+            log.error("\n✗ Failed to authenticate. Check your token.")
             return
 
-        print(f"ℹ  Your user ID: {user_id}\n")
+        schedule = PollScheduler(min_interval, max_interval, backoff)
+        log.info("ℹ  Polling every %g-%gs per channel", schedule.min_interval, schedule.max_interval)
+
+        next_discovery = 0.0
+        next_export = time.monotonic() + metrics_interval
+        self.start_pipeline()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_discovery:
+                    # Rebuild rules too, so relative date filters like "today" roll over
+                    self.rules = self.build_rules(user_id, keywords, date_filter)
+                    self.refresh_poll_targets(schedule, channel_links, date_filter)
+                    log.info("ℹ  Scheduled %s channel(s)", len(schedule.intervals))
+                    next_discovery = now + discovery_interval
+
+                jobs = [
+                    lambda guild_id=guild_id, channel_id=channel_id: self.poll_channel(schedule, guild_id, channel_id, user_id, date_filter=date_filter, keywords=keywords)
+                    for guild_id, channel_id in schedule.due()
+                ]
+                if concurrency > 1 and len(jobs) > 1:
+                    asyncio.run(self.run_jobs(jobs, concurrency))
+                else:
+                    for job in jobs:
+                        self.run_job(job)
+
+                if time.monotonic() >= next_export:
+                    self.export_metrics()
+                    next_export = time.monotonic() + metrics_interval
+
+                time.sleep(min(schedule.wait_time(), max(0.0, next_discovery - time.monotonic()), metrics_interval))
+        except KeyboardInterrupt:
+            log.info("\nℹ  Stopping daemon...")
+        finally:
+            self.stop_pipeline()
+            self.export_metrics()
+
+    def iter_matches(self, pages: Iterator[Tuple[List[MessageRecord], int]], rules: RuleSet) -> Iterator[Tuple[List[Tuple[MessageRecord, List[str]]], int]]:
+        """Stream pages of messages through the rules
+
+        Yields (matches, cursor) per page, so history is filtered as it is
+        fetched and never held in memory beyond one page.
+        """
+        for page, cursor in pages:
+            self.metrics.increment("messages_scanned", len(page))
+            matches = []
+            for msg in page:
+                emojis, _ = rules.evaluate(msg)
+                if emojis:
+                    matches.append((msg, emojis))
+            self.metrics.increment("matches", len(matches))
+            yield matches, cursor
+
+    def backfill_segment(self, progress: BackfillProgress, guild_id: str, channel_id: str, lower: int, upper: int, user_id: str):
+        """Read one snowflake segment of a channel and react to its matches
+
+        Progress is recorded after each page once its reactions are confirmed,
+        so an interrupted segment resumes from its last handled page and
+        messages whose reactions failed are read again. A segment reaching
+        into the future is only recorded as read up to when reading started.
+        Segments that fail are left for the next backfill.
+        """
+        cursor = progress.get(channel_id, lower, upper)
+        start = lower if cursor is None else cursor + 1
+        if start >= upper:
+            return
 
-        # If specific channel links provided, process only those
+        def advance(cursor: int):
+            progress.advance(channel_id, lower, upper, cursor)
+            if progress.is_done(channel_id, lower, upper):
+                self.metrics.increment("segments_completed")
+
+        # Messages posted after this may be missed by the pages read below
+        end = min(upper, datetime_to_snowflake(self.now or datetime.now(timezone.utc)))
+        found = 0
+        tracker = CommitTracker(advance)
+        try:
+            pages = self.iter_message_pages(channel_id, start, upper)
+            for matches, cursor in self.iter_matches(pages, self.rules):
+                if matches:
+                    found += len(matches)
+                    confirmed = self.ledger.lookup([msg.id for msg, _ in matches])
+                    for msg, emojis in matches:
+                        message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{msg.id}"
+                        self.react_to_message(channel_id, msg.id, message_link, message=msg, user_id=user_id, confirmed=confirmed.get(msg.id, set()), emojis=emojis, tracker=tracker)
+                tracker.read_up_to(cursor)
+            # The whole segment has been read, up to the present
+            tracker.read_up_to(end - 1)
+        except Exception as e:
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code in (403, 404):
+                self.metadata.invalidate_channel(channel_id)
+            log.error("  ✗ Failed to backfill channel %s: %s", channel_id, e)
+            return
+
+        span = f"{snowflake_to_datetime(lower):%Y-%m-%d %H:%M}..{snowflake_to_datetime(upper):%Y-%m-%d %H:%M}"
+        log.info("  ✓ Channel %s %s read: %s match(es)", channel_id, span, found)
+
+    def backfill(self, channel_links: Optional[List[str]] = None, date_filter: Optional[str] = None, keywords: List[str] = None, segments: int = 8, concurrency: int = 4, progress: Optional[BackfillProgress] = None, time_budget: Optional[float] = None):
+        """Scan a long date range by reading many snowflake segments in parallel
+
+        The range is split into `segments` equal time spans per channel, and
+        the (channel, segment) jobs are interleaved across channels so
+        concurrent workers mostly hit different per-channel rate limit buckets.
+        Checkpoints are not touched; progress is tracked per segment instead.
+
+        Args:
+            date_filter: The range to backfill, e.g. "2025-10-01..2025-11-01".
+            progress: Where segment progress is kept; resumes an interrupted
+                     backfill of the same range.
+            time_budget: Optional limit in seconds, as for run().
+        """
+        log.info("=" * 60)
+        log.info("Discord Birthday Message Reactor (backfill)")
+        log.info("=" * 60)
+        log.warning("\n⚠  WARNING: This violates Discord's Terms of Service!")
+        log.info("   Use at your own risk.\n")
+
+        try:
+            lower, upper = parse_date_window(date_filter or "", now=self.now)
+        except ValueError:
+            log.error("✗ Backfill needs a date range, e.g. 2025-10-01..2025-11-01 (got '%s')", date_filter or '')
+            return
+        user_id = self.get_user_id()
+        if not user_id:
+            log.error("\n✗ Failed to authenticate. Check your token.")
+            return
+
+        self.rules = self.build_rules(user_id, keywords, date_filter)
+        progress = progress or BackfillProgress()
+
+        targets = []
         if channel_links:
-            print(f"✓ Processing {len(channel_links)} specific channel(s)")
-            if date_filter:
-                print(f"ℹ  Date filter: {date_filter}")
-            if keywords:
-                print(f"ℹ  Keywords: {', '.join(keywords)}")
             for link in channel_links:
                 parsed = self.parse_channel_link(link)
                 if parsed:
-                    guild_id, channel_id = parsed
-                    self.process_specific_channel(
-                        guild_id,
-                        channel_id,
-                        user_id,
-                        date_filter=date_filter,
-                        keywords=keywords
-                    )
-                    time.sleep(1)
+                    targets.append(parsed)
                 else:
-                    print(f"✗ Invalid channel link: {link}")
+                    log.error("✗ Invalid channel link: %s", link)
+        else:
+            channels = []
+            for guild in self.get_guilds():
+                channels.extend((guild['id'], channel) for channel in self.get_channels(guild['id']) if channel.get('type') in TEXT_CHANNEL_TYPES)
+            channels.extend(("@me", channel) for channel in self.get_dm_channels())
+            # Channels whose newest message predates the range have nothing to backfill
+            targets = [(guild_id, channel['id']) for guild_id, channel in channels if int(channel.get('last_message_id') or 0) >= lower]
+
+        # Segments are cut from the whole range so their keys stay stable
+        # between runs, but ones that start in the future have nothing to read
+        now = datetime_to_snowflake(self.now or datetime.now(timezone.utc))
+        spans = [span for span in split_snowflake_range(lower, upper, segments) if span[0] <= now]
+        jobs = []
+        pending = []
+        for segment_lower, segment_upper in spans:
+            for guild_id, channel_id in targets:
+                if not progress.is_done(channel_id, segment_lower, segment_upper):
+                    pending.append((channel_id, segment_lower, segment_upper))
+                    jobs.append(lambda guild_id=guild_id, channel_id=channel_id, segment_lower=segment_lower, segment_upper=segment_upper: self.backfill_segment(
+                        progress, guild_id, channel_id, segment_lower, segment_upper, user_id
+                    ))
+
+        log.info("ℹ  Backfilling %s across %s channel(s) in %s segment(s) each", date_filter, len(targets), len(spans))
+        if len(jobs) < len(spans) * len(targets):
+            log.info("ℹ  Resuming: %s segment(s) already done", len(spans) * len(targets) - len(jobs))
+
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self.start_pipeline()
+        try:
+            asyncio.run(self.run_jobs(jobs, max(1, concurrency)))
+        except KeyboardInterrupt:
+            log.info("\nℹ  Stopping backfill, progress is saved...")
+        finally:
+            self.stop_pipeline()
+            self.deadline = None
+
+        self.export_metrics()
+        counters = self.metrics.summary()["counters"]
+        # Only segments whose saved progress reaches their end are done; ones
+        # held back by failed reactions or reaching into the present are not
+        remaining = sum(1 for segment in pending if not progress.is_done(*segment))
+
+        log.info("\n" + "=" * 60)
+        if remaining == 0:
+            log.info("✓ Backfill completed!")
         else:
-            # Original behavior: search all guilds and DMs
-            guilds = self.get_guilds()
-            print(f"\n✓ Found {len(guilds)} guild(s)")
+            log.warning("⚠  Backfill stopped with %s segment(s) left, run again to resume", remaining)
+        log.info("ℹ  %s message(s) scanned, %s reaction(s) added", counters.get('messages_scanned', 0), counters.get('reactions_added', 0))
+        log.info("=" * 60)
+
+    def get_gateway_url(self) -> str:
+        """Get the gateway WebSocket URL"""
+        try:
+            response = self._request("GET", "/gateway")
+            response.raise_for_status()
+            return response.json().get("url") or DEFAULT_GATEWAY_URL
+        except Exception as e:
+            log.warning("⚠ Failed to get gateway URL, using default: %s", e)
+            return DEFAULT_GATEWAY_URL
+
+    def listen(self, channel_links: Optional[List[str]] = None, keywords: List[str] = None, gateway_url: Optional[str] = None, queue_size: int = 100, metrics_interval: float = 60.0, reconnect_delay: float = 5.0):
+        """Long-running mode reacting to new messages as they arrive over the gateway
+
+        Args:
+            channel_links: Optional list of Discord channel links to watch.
+                          If not provided, messages from every channel are considered.
+            keywords: List of keywords to search for in messages (case-insensitive).
+            gateway_url: Gateway WebSocket URL, e.g. a local fake gateway for testing.
+                        Looked up from the API if not provided.
+            queue_size: Maximum number of matched messages waiting to be reacted to.
+                       Further matches are dropped (and logged) while the queue is full.
+            metrics_interval: Seconds between metrics file exports.
+            reconnect_delay: Seconds to wait before reconnecting to the gateway.
+        """
+        log.info("=" * 60)
+        log.info("Discord Birthday Message Reactor (listen mode)")
+        log.info("=" * 60)
+        log.warning("\n⚠  WARNING: This violates Discord's Terms of Service!")
+        log.info("   Use at your own risk.\n")
 
-            # Process each guild
-            for guild in guilds:
-                self.process_guild(guild, user_id)
-                time.sleep(1)  # Delay between guilds
+        user_id = self.get_user_id()
+        if not user_id:
+            log.error("\n✗ Failed to authenticate. Check your token.")
+            return
 
-            # Process DM channels
-            self.process_dm_channels(user_id)
+        self.rules = self.build_rules(user_id, keywords)
+        rules_day = datetime.now(timezone.utc).date()
 
-        print("\n" + "=" * 60)
-        print("✓ Completed!")
-        print("=" * 60)
+        channel_ids = None
+        if channel_links:
+            channel_ids = set()
+            for link in channel_links:
+                parsed = self.parse_channel_link(link)
+                if parsed:
+                    channel_ids.add(parsed[1])
+                else:
+                    log.error("✗ Invalid channel link: %s", link)
+            log.info("✓ Watching %s specific channel(s)", len(channel_ids))
+
+        reaction_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        def react_worker():
+            while True:
+                msg, emojis = reaction_queue.get()
+                try:
+                    channel_id = msg.channel_id
+                    message_id = msg.id
+                    guild_id = msg.guild_id or "@me"
+                    message_link = f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+                    self.react_to_message(channel_id, message_id, message_link, message=msg, user_id=user_id, emojis=emojis)
+                except Exception as e:
+                    log.error("  ✗ Error processing message: %s", e)
+                finally:
+                    reaction_queue.task_done()
+
+        def on_dispatch(event: str, data: Dict):
+            nonlocal rules_day
+            if event == "READY":
+                log.info("✓ Connected to gateway, listening for new messages...")
+                return
+            if event != "MESSAGE_CREATE":
+                return
+            if channel_ids is not None and data.get('channel_id') not in channel_ids:
+                return
+            # Rules with a "today" date filter move on to the new day
+            today = datetime.now(timezone.utc).date()
+            if today != rules_day:
+                self.rules = self.build_rules(user_id, keywords)
+                rules_day = today
+
+            self.metrics.increment("messages_scanned")
+            msg = MessageRecord.from_api(data)
+            emojis, keyword = self.rules.evaluate(msg)
+            if not emojis:
+                return
+            self.metrics.increment("matches")
+
+            log.info("\n  ✓ Match (keyword: '%s') in channel %s", keyword, msg.channel_id)
+            try:
+                reaction_queue.put_nowait((msg, emojis))
+            except queue.Full:
+                self.metrics.increment("matches_dropped")
+                log.warning("  ⚠ Reaction queue full, dropping message %s", msg.id)
+
+        stop_exporting = threading.Event()
+
+        def export_worker():
+            while not stop_exporting.wait(metrics_interval):
+                self.export_metrics()
+
+        self.start_pipeline()
+        threading.Thread(target=react_worker, daemon=True).start()
+        threading.Thread(target=export_worker, daemon=True).start()
+
+        gateway = GatewayClient(self.token, gateway_url or self.get_gateway_url(), on_dispatch, reconnect_delay=reconnect_delay)
+        try:
+            gateway.run_forever()
+        except KeyboardInterrupt:
+            log.info("\nℹ  Stopping listener...")
+            gateway.stop()
+        finally:
+            stop_exporting.set()
+            # Matches already received still get their reactions
+            reaction_queue.join()
+            self.stop_pipeline()
+            self.export_metrics()
 
 
 def main():
     # Load environment variables from .env file
     load_dotenv()
 
+    # Set up logging: LOG_LEVEL (DEBUG, INFO, WARNING or quiet) and LOG_FORMAT
+    # (console or json); output is written by a background thread
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "console").strip().lower()
+    listener = setup_logging(os.getenv("LOG_LEVEL", "INFO"), LOG_FORMAT)
+    atexit.register(listener.stop)
+    if LOG_FORMAT not in ("console", "json"):
+        log.warning("⚠ Warning: Unknown LOG_FORMAT '%s', using 'console'", LOG_FORMAT)
+
     # Get Discord token (required)
     TOKEN = os.getenv("DISCORD_TOKEN")
+
+    # Get record/replay settings: HTTP_RECORD writes a cassette of the run's API
+    # traffic, HTTP_REPLAY answers requests from one instead of the live API
+    HTTP_RECORD = os.getenv("HTTP_RECORD", "").strip() or None
+    HTTP_REPLAY = os.getenv("HTTP_REPLAY", "").strip() or None
+    REPLAY_PACING = os.getenv("REPLAY_PACING", "original").strip().lower()
+    if REPLAY_PACING not in ("original", "fast"):
+        log.warning("⚠ Warning: Unknown REPLAY_PACING '%s', using 'original'", REPLAY_PACING)
+        REPLAY_PACING = "original"
+    if HTTP_REPLAY and not TOKEN:
+        # Cassettes do not contain the token, any value works
+        TOKEN = "replay"
+
     if not TOKEN:
-        print("❌ Error: DISCORD_TOKEN not found in .env file")
-        print("Please create a .env file with your Discord token.")
-        print("See .env.example for template.")
+        log.error("❌ Error: DISCORD_TOKEN not found in .env file")
+        log.info("Please create a .env file with your Discord token.")
+        log.info("See .env.example for template.")
         sys.exit(1)
 
     # Get channel links (optional, comma-separated)
@@ -536,6 +3244,10 @@ def main():
     keywords_str = os.getenv("KEYWORDS", "birthday,HBD,sinh nhật")
     KEYWORDS = [keyword.strip() for keyword in keywords_str.split(",") if keyword.strip()]
 
+    # Get plain-text names that count as mentioning you (comma-separated)
+    aliases_str = os.getenv("MENTION_ALIASES", "Hieu Le")
+    MENTION_ALIASES = [alias.strip() for alias in aliases_str.split(",") if alias.strip()]
+
     # Get date filter (optional)
     DATE_FILTER = os.getenv("DATE_FILTER", "").strip() or None
 
@@ -543,30 +3255,229 @@ def main():
     emojis_str = os.getenv("REACTION_EMOJIS", "❤️,💖,🚀")
     REACTION_EMOJIS = [emoji.strip() for emoji in emojis_str.split(",") if emoji.strip()]
 
+    # Get reaction rules file (optional JSON list of rules, replaces KEYWORDS/MENTION_ALIASES/REACTION_EMOJIS)
+    RULES = None
+    RULES_FILE = os.getenv("RULES_FILE", "").strip()
+    if RULES_FILE:
+        try:
+            with open(RULES_FILE, "r", encoding="utf-8") as f:
+                RULES = [ReactionRule.from_dict(rule, REACTION_EMOJIS) for rule in json.load(f)]
+        except (OSError, ValueError, AttributeError) as e:
+            log.error("❌ Error: Could not load RULES_FILE %s: %s", RULES_FILE, e)
+            sys.exit(1)
+
     # Get delay settings
     try:
         DELAY_MIN = float(os.getenv("REACTION_DELAY_MIN", "1.0"))
         DELAY_MAX = float(os.getenv("REACTION_DELAY_MAX", "2.0"))
     except ValueError:
-        print("⚠ Warning: Invalid delay values in .env, using defaults (1.0-2.0s)")
+        log.warning("⚠ Warning: Invalid delay values in .env, using defaults (1.0-2.0s)")
         DELAY_MIN = 1.0
         DELAY_MAX = 2.0
 
+    # Get number of channels/guilds to scan concurrently
+    try:
+        CONCURRENCY = max(1, int(os.getenv("CONCURRENCY", "1")))
+    except ValueError:
+        log.warning("⚠ Warning: Invalid CONCURRENCY in .env, using default (1)")
+        CONCURRENCY = 1
+
+    # Get HTTP connection settings
+    try:
+        POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+        CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0"))
+        READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30.0"))
+    except ValueError:
+        log.warning("⚠ Warning: Invalid HTTP settings in .env, using defaults (pool 10, timeouts 5.0/30.0s)")
+        POOL_SIZE = 10
+        CONNECT_TIMEOUT = 5.0
+        READ_TIMEOUT = 30.0
+
+    # Get retry and circuit breaker settings
+    try:
+        MAX_RETRIES = max(0, int(os.getenv("HTTP_MAX_RETRIES", "3")))
+        BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+        BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "30"))
+    except ValueError:
+        log.warning("⚠ Warning: Invalid retry settings in .env, using defaults (3 retries, breaker 5 failures/30s)")
+        MAX_RETRIES = 3
+        BREAKER_THRESHOLD = 5
+        BREAKER_COOLDOWN = 30.0
+
+    # Get run time budget in seconds (empty for no limit)
+    try:
+        RUN_TIME_BUDGET = float(os.getenv("RUN_TIME_BUDGET", "").strip() or 0) or None
+    except ValueError:
+        log.warning("⚠ Warning: Invalid RUN_TIME_BUDGET in .env, running without a time budget")
+        RUN_TIME_BUDGET = None
+
+    if HTTP_REPLAY:
+        transport = ReplayTransport(HTTP_REPLAY, pacing=REPLAY_PACING)
+        log.info("ℹ  Replaying API traffic from %s (%s pacing)", HTTP_REPLAY, REPLAY_PACING)
+        if transport.recorded_at is not None:
+            log.info("ℹ  'today' date filters use the recording date: %s", transport.recorded_at.date().isoformat())
+    else:
+        transport = HTTPTransport(
+            pool_size=max(POOL_SIZE, CONCURRENCY),
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT
+        )
+        if HTTP_RECORD:
+            transport = RecordingTransport(transport, HTTP_RECORD, token=TOKEN)
+            log.info("ℹ  Recording API traffic to %s", HTTP_RECORD)
+
+    # Get checkpoint file (empty disables persistence between runs)
+    CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", ".discord_checkpoints.json").strip() or None
+
+    # Get metadata cache settings
+    METADATA_CACHE_FILE = os.getenv("METADATA_CACHE_FILE", ".discord_metadata.json").strip() or None
+    METADATA_REFRESH = os.getenv("METADATA_REFRESH", "").strip().lower() in ("1", "true", "yes")
+    METADATA_TTLS = {}
+    for item in os.getenv("METADATA_TTLS", "").split(","):
+        if "=" not in item:
+            continue
+        kind, seconds = item.split("=", 1)
+        try:
+            METADATA_TTLS[kind.strip()] = float(seconds)
+        except ValueError:
+            log.warning("⚠ Warning: Invalid METADATA_TTLS entry '%s', ignoring", item.strip())
+
+    # Get guild scan mode: "search" (guild-wide search) or "channels" (per-channel scans)
+    GUILD_SCAN_MODE = os.getenv("GUILD_SCAN_MODE", "search").strip().lower()
+    if GUILD_SCAN_MODE not in ("search", "channels"):
+        log.warning("⚠ Warning: Unknown GUILD_SCAN_MODE '%s', using 'search'", GUILD_SCAN_MODE)
+        GUILD_SCAN_MODE = "search"
+
+    # Get reaction pipeline settings
+    try:
+        REACTION_WORKERS = max(1, int(os.getenv("REACTION_WORKERS", "2")))
+        REACTION_QUEUE_SIZE = max(1, int(os.getenv("REACTION_QUEUE_SIZE", "100")))
+    except ValueError:
+        log.warning("⚠ Warning: Invalid REACTION_WORKERS or REACTION_QUEUE_SIZE in .env, using defaults (2, 100)")
+        REACTION_WORKERS = 2
+        REACTION_QUEUE_SIZE = 100
+
+    # Get metrics export files (empty disables each)
+    METRICS_JSON = os.getenv("METRICS_JSON", "").strip() or None
+    METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS", "").strip() or None
+
+    # Get profiling outputs (empty disables each): a Chrome trace of timing
+    # spans and a directory for per-phase cProfile stats
+    PROFILE_TRACE = os.getenv("PROFILE_TRACE", "").strip() or None
+    PROFILE_CPROFILE_DIR = os.getenv("PROFILE_CPROFILE_DIR", "").strip() or None
+
+    # Get reaction ledger database (empty keeps it in memory only)
+    REACTION_LEDGER = os.getenv("REACTION_LEDGER", ".discord_reactions.db").strip() or ":memory:"
+
+    if HTTP_REPLAY:
+        # Keep replays reproducible: persisted state would skip recorded requests
+        CHECKPOINT_FILE = None
+        METADATA_CACHE_FILE = None
+        REACTION_LEDGER = ":memory:"
+
     # Create reactor instance with configuration
     reactor = DiscordReactor(
         token=TOKEN,
         reaction_emojis=REACTION_EMOJIS,
         delay_min=DELAY_MIN,
-        delay_max=DELAY_MAX
+        delay_max=DELAY_MAX,
+        max_retries=MAX_RETRIES,
+        transport=transport,
+        checkpoints=CheckpointStore(CHECKPOINT_FILE),
+        mention_aliases=MENTION_ALIASES,
+        ledger=ReactionLedger(REACTION_LEDGER),
+        metadata=MetadataCache(METADATA_CACHE_FILE, ttls=METADATA_TTLS, refresh=METADATA_REFRESH),
+        guild_scan_mode=GUILD_SCAN_MODE,
+        metrics_json=METRICS_JSON,
+        metrics_prometheus=METRICS_PROMETHEUS,
+        reaction_workers=REACTION_WORKERS,
+        reaction_queue_size=REACTION_QUEUE_SIZE,
+        rules=RULES,
+        circuit_breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN),
+        profiler=Profiler(PROFILE_TRACE, PROFILE_CPROFILE_DIR),
+        now=transport.recorded_at if HTTP_REPLAY else None
     )
 
+    # Get run mode: "once" scans and exits, "listen" reacts to new messages live,
+    # "daemon" stays resident and polls channels on adaptive intervals,
+    # "backfill" scans a long date range in parallel segments
+    RUN_MODE = os.getenv("RUN_MODE", "once").strip().lower()
+
+    if RUN_MODE == "daemon":
+        try:
+            POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "30"))
+            POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "1800"))
+            POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", "2.0"))
+            DISCOVERY_INTERVAL = float(os.getenv("DISCOVERY_INTERVAL", "600"))
+            METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))
+        except ValueError:
+            log.warning("⚠ Warning: Invalid polling settings in .env, using defaults (30-1800s, backoff 2.0, discovery 600s)")
+            POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF = 30.0, 1800.0, 2.0
+            DISCOVERY_INTERVAL, METRICS_INTERVAL = 600.0, 60.0
+        reactor.daemon(
+            channel_links=CHANNEL_LINKS or None,
+            date_filter=DATE_FILTER,
+            keywords=KEYWORDS,
+            concurrency=CONCURRENCY,
+            min_interval=POLL_MIN_INTERVAL,
+            max_interval=POLL_MAX_INTERVAL,
+            backoff=POLL_BACKOFF,
+            discovery_interval=DISCOVERY_INTERVAL,
+            metrics_interval=METRICS_INTERVAL
+        )
+        transport.close()
+        reactor.ledger.close()
+        return
+
+    if RUN_MODE == "backfill":
+        try:
+            BACKFILL_SEGMENTS = max(1, int(os.getenv("BACKFILL_SEGMENTS", "8")))
+        except ValueError:
+            log.warning("⚠ Warning: Invalid BACKFILL_SEGMENTS in .env, using default (8)")
+            BACKFILL_SEGMENTS = 8
+        BACKFILL_RANGE = os.getenv("BACKFILL_RANGE", "").strip() or DATE_FILTER
+        BACKFILL_PROGRESS_FILE = os.getenv("BACKFILL_PROGRESS_FILE", ".discord_backfill.json").strip() or None
+        if HTTP_REPLAY:
+            BACKFILL_PROGRESS_FILE = None
+        reactor.backfill(
+            channel_links=CHANNEL_LINKS or None,
+            date_filter=BACKFILL_RANGE,
+            keywords=KEYWORDS,
+            segments=BACKFILL_SEGMENTS,
+            concurrency=CONCURRENCY,
+            progress=BackfillProgress(BACKFILL_PROGRESS_FILE),
+            time_budget=RUN_TIME_BUDGET
+        )
+        transport.close()
+        reactor.ledger.close()
+        return
+
+    if RUN_MODE == "listen":
+        try:
+            QUEUE_SIZE = int(os.getenv("LISTEN_QUEUE_SIZE", "100"))
+            METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))
+        except ValueError:
+            log.warning("⚠ Warning: Invalid LISTEN_QUEUE_SIZE or METRICS_INTERVAL in .env, using defaults (100, 60s)")
+            QUEUE_SIZE = 100
+            METRICS_INTERVAL = 60.0
+        GATEWAY_URL = os.getenv("GATEWAY_URL", "").strip() or None
+        reactor.listen(channel_links=CHANNEL_LINKS or None, keywords=KEYWORDS, gateway_url=GATEWAY_URL, queue_size=QUEUE_SIZE, metrics_interval=METRICS_INTERVAL)
+        transport.close()
+        reactor.ledger.close()
+        return
+    elif RUN_MODE != "once":
+        log.warning("⚠ Warning: Unknown RUN_MODE '%s', using 'once'", RUN_MODE)
+
     # Run the reactor
     if CHANNEL_LINKS:
-        reactor.run(channel_links=CHANNEL_LINKS, date_filter=DATE_FILTER, keywords=KEYWORDS)
+        reactor.run(channel_links=CHANNEL_LINKS, date_filter=DATE_FILTER, keywords=KEYWORDS, concurrency=CONCURRENCY, time_budget=RUN_TIME_BUDGET)
     else:
-        print("\nℹ  No specific channels provided. Searching all accessible channels...")
-        print("   To search specific channels only, add CHANNEL_LINKS to .env file.\n")
-        reactor.run(date_filter=DATE_FILTER, keywords=KEYWORDS)
+        log.info("\nℹ  No specific channels provided. Searching all accessible channels...")
+        log.info("   To search specific channels only, add CHANNEL_LINKS to .env file.\n")
+        reactor.run(date_filter=DATE_FILTER, keywords=KEYWORDS, concurrency=CONCURRENCY, time_budget=RUN_TIME_BUDGET)
+
+    transport.close()
+    reactor.ledger.close()
 
 
 if __name__ == "__main__":
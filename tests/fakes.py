@@ -0,0 +1,472 @@
+"""
+Local stand-ins for the Discord REST API and gateway, used by the tests and benchmark.py
+
+FakeDiscordAPI holds an in-memory data set, FakeDiscordServer serves it over
+HTTP on localhost and FakeDiscordGateway speaks the gateway protocol over a
+websocket, so the reactor can be driven end to end without reaching Discord.
+make_reactor builds the reactor the tests drive.
+"""
+
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from discord_birthday_reactor import DiscordReactor, datetime_to_snowflake
+
+
+USER_ID = "100000000000000001"
+SEARCH_PAGE_SIZE = 25
+
+
+def make_reactor(test, **kwargs: Any) -> DiscordReactor:
+    """Build a DiscordReactor for a test, without reaction delays
+
+    Checkpoints, the ledger and the metadata cache are the in-memory defaults;
+    the ledger and transport are closed when the test finishes.
+    """
+    reactor = DiscordReactor(**dict({"token": "test-token", "delay_min": 0.0, "delay_max": 0.0}, **kwargs))
+    test.addCleanup(reactor.ledger.close)
+    test.addCleanup(reactor.transport.close)
+    return reactor
+
+
+class FakeDiscordAPI:
+    """In-memory Discord API data set served over local HTTP
+
+    Generates guilds, channels, DMs and messages for today (UTC). Roughly
+    `match_rate` of messages contain a birthday keyword and mention the user.
+    """
+
+    def __init__(self, guilds: int = 3, channels_per_guild: int = 10, dm_channels: int = 5,
+                 messages_per_channel: int = 200, match_rate: float = 0.02,
+                 latency: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.requests: Counter = Counter()
+        self.bytes_sent = 0
+        self.rate_limited = 0
+        self.reactions = 0
+        # Message IDs whose reactions are refused with 403 Missing Permissions
+        self.forbidden: Set[str] = set()
+        # Return each search hit with the message before it as unflagged context
+        self.search_context = False
+
+        self.guilds: List[Dict] = []
+        self.channels: Dict[str, List[Dict]] = {}
+        self.dm_channels: List[Dict] = []
+        self.messages: Dict[str, List[Dict]] = {}  # channel_id -> messages, oldest first
+
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        next_id = iter(range(1, 10 ** 9))
+
+        def make_channel(channel_id: str, guild_id: Optional[str]) -> Dict:
+            messages = []
+            for i in range(messages_per_channel):
+                ts = start + timedelta(seconds=i * 60 * 60 * 24 / max(messages_per_channel, 1))
+                is_match = self.random.random() < match_rate
+                content = "happy birthday <@%s> 🎉" % USER_ID if is_match else "just chatting about message %d" % i
+                messages.append({
+                    "id": str(datetime_to_snowflake(ts) + next(next_id)),
+                    "channel_id": channel_id,
+                    "guild_id": guild_id,
+                    "content": content,
+                    "timestamp": ts.isoformat(),
+                    "author": {"id": "200000000000000002", "username": "friend", "discriminator": "0"},
+                    "mentions": [{"id": USER_ID, "username": "me"}] if is_match else [],
+                    "embeds": [],
+                    "attachments": [],
+                    "reactions": [],
+                })
+            self.messages[channel_id] = messages
+            return {
+                "id": channel_id,
+                "type": 0 if guild_id else 1,
+                "guild_id": guild_id,
+                "name": f"channel-{channel_id}",
+                "last_message_id": messages[-1]["id"] if messages else None,
+            }
+
+        for g in range(guilds):
+            guild_id = str(300000000000000000 + g)
+            self.guilds.append({"id": guild_id, "name": f"Guild {g}"})
+            self.channels[guild_id] = []
+            for c in range(channels_per_guild):
+                channel_id = str(400000000000000000 + g * 10000 + c)
+                self.channels[guild_id].append(make_channel(channel_id, guild_id))
+
+        for d in range(dm_channels):
+            channel_id = str(500000000000000000 + d)
+            channel = make_channel(channel_id, None)
+            channel["recipients"] = [{"id": str(600000000000000000 + d), "username": f"dm-{d}"}]
+            self.dm_channels.append(channel)
+
+    @property
+    def total_messages(self) -> int:
+        return sum(len(messages) for messages in self.messages.values())
+
+    def handle(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Optional[object]]:
+        """Return (status, JSON body) for an API request"""
+        parts = path.strip("/").split("/")
+
+        if method == "PUT" and "reactions" in parts:
+            channel_id, message_id, emoji = parts[1], parts[3], unquote(parts[5])
+            # Custom emojis are addressed as name:id
+            name, _, emoji_id = emoji.partition(":")
+            emoji = {"id": emoji_id or None, "name": name}
+            if message_id in self.forbidden:
+                return 403, {"message": "Missing Permissions", "code": 50013}
+            for msg in self.messages.get(channel_id, []):
+                if msg["id"] == message_id:
+                    with self.lock:
+                        self.reactions += 1
+                        for reaction in msg["reactions"]:
+                            if reaction["emoji"] == emoji:
+                                reaction["me"] = True
+                                break
+                        else:
+                            msg["reactions"].append({"emoji": emoji, "count": 1, "me": True})
+                    return 204, None
+            return 404, {"message": "Unknown Message", "code": 10008}
+
+        if method != "GET":
+            return 405, {"message": "405: Method Not Allowed", "code": 0}
+
+        if path == "/users/@me":
+            return 200, {"id": USER_ID, "username": "me", "discriminator": "0"}
+        if path == "/users/@me/guilds":
+            return 200, self.guilds
+        if path == "/users/@me/channels":
+            return 200, self.dm_channels
+        if len(parts) == 3 and parts[0] == "guilds" and parts[2] == "channels":
+            return 200, self.channels.get(parts[1], [])
+        if len(parts) == 4 and parts[0] == "guilds" and parts[2:] == ["messages", "search"]:
+            return self._search(parts[1], query)
+        if len(parts) == 3 and parts[0] == "channels" and parts[2] == "messages":
+            return self._list_messages(parts[1], query)
+        if len(parts) == 4 and parts[0] == "channels" and parts[2] == "messages":
+            for msg in self.messages.get(parts[1], []):
+                if msg["id"] == parts[3]:
+                    return 200, msg
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 404, {"message": "404: Not Found", "code": 0}
+
+    def _list_messages(self, channel_id: str, query: Dict[str, str]) -> Tuple[int, object]:
+        if channel_id not in self.messages:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        messages = self.messages[channel_id]
+        limit = min(int(query.get("limit", 50)), 100)
+        if "after" in query:
+            after = int(query["after"])
+            page = [msg for msg in messages if int(msg["id"]) > after][:limit]
+        elif "before" in query:
+            before = int(query["before"])
+            page = [msg for msg in messages if int(msg["id"]) < before][-limit:]
+        else:
+            page = messages[-limit:]
+        return 200, list(reversed(page))
+
+    def _search(self, guild_id: str, query: Dict[str, str]) -> Tuple[int, object]:
+        content = query.get("content", "").lower()
+        mentions = query.get("mentions")
+        min_id = int(query.get("min_id", 0))
+        max_id = int(query.get("max_id", 2 ** 63))
+        offset = int(query.get("offset", 0))
+
+        results = []
+        for channel in self.channels.get(guild_id, []):
+            for msg in self.messages[channel["id"]]:
+                if not min_id < int(msg["id"]) < max_id:
+                    continue
+                if content and not all(word in msg["content"].lower() for word in content.split()):
+                    continue
+                if mentions and not any(m["id"] == mentions for m in msg["mentions"]):
+                    continue
+                results.append(msg)
+        results.sort(key=lambda msg: int(msg["id"]), reverse=True)
+        page = results[offset:offset + SEARCH_PAGE_SIZE]
+        if not self.search_context:
+            return 200, {"total_results": len(results), "messages": [[msg] for msg in page]}
+
+        entries = []
+        for msg in page:
+            channel = self.messages[msg["channel_id"]]
+            before = [other for other in channel if int(other["id"]) < int(msg["id"])][-1:]
+            entries.append(before + [dict(msg, hit=True)])
+        return 200, {"total_results": len(results), "messages": entries}
+
+
+class FakeDiscordServer:
+    """Serves a FakeDiscordAPI on localhost in a background thread"""
+
+    def __init__(self, api: FakeDiscordAPI):
+        self.api = api
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+            def _serve(self, method: str):
+                parsed = urlparse(self.path)
+                path = parsed.path[len("/api/v10"):]
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                route = re.sub(r"/\d+", "/{id}", path.split("/reactions/")[0])
+                if "/reactions/" in path:
+                    route += "/reactions"
+
+                if api.latency:
+                    time.sleep(api.latency)
+
+                headers = {}
+                with api.lock:
+                    api.requests[f"{method} {route}"] += 1
+                    limited = api.random.random() < api.rate_limit_rate
+                    if limited:
+                        api.rate_limited += 1
+                if limited:
+                    status, body = 429, {"message": "You are being rate limited.", "retry_after": 0.05, "global": False}
+                    headers = {"X-RateLimit-Bucket": route, "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.05"}
+                else:
+                    status, body = api.handle(method, path, query)
+
+                data = json.dumps(body).encode() if body is not None else b""
+                with api.lock:
+                    api.bytes_sent += len(data)
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v10"
+
+    def __enter__(self) -> "FakeDiscordServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeDiscordGateway:
+    """Minimal local stand-in for the Discord gateway (websocket, JSON encoding)
+
+    Each connection gets HELLO and must IDENTIFY (answered with READY) or RESUME
+    (missed events are replayed, then RESUMED). Heartbeats are acknowledged.
+    dispatch() sends an event to the connected client, or keeps it for the
+    next RESUME; reconnect(), invalidate_session() and close() drive the
+    session lifecycle. Opcodes sent by the client are recorded in `received`.
+    """
+
+    WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    def __init__(self, heartbeat_interval_ms: int = 1000):
+        self.heartbeat_interval_ms = heartbeat_interval_ms
+        self.cond = threading.Condition()
+        self.received: List[int] = []
+        self.sessions_started = 0  # READY or RESUMED sent
+        self.session_id: Optional[str] = None
+        self.history: List[Dict] = []  # dispatched payloads of the current session
+        self.conn: Optional[socket.socket] = None
+        self.send_lock = threading.Lock()
+
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.sock.getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    def __enter__(self) -> "FakeDiscordGateway":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.sock.close()
+        with self.cond:
+            if self.conn is not None:
+                self.conn.close()
+
+    def wait_for_session(self, count: int, timeout: float = 10.0) -> bool:
+        """Wait until `count` sessions have been started (identified or resumed)"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.sessions_started >= count, timeout)
+
+    def dispatch(self, event: str, data: Dict):
+        """Send a dispatch event, or keep it for replay if the client is away"""
+        with self.cond:
+            payload = {"op": 0, "t": event, "s": len(self.history) + 1, "d": data}
+            self.history.append(payload)
+            conn = self.conn
+        if conn is not None:
+            self._send_json(conn, payload)
+
+    def reconnect(self):
+        """Ask the client to reconnect and resume (op 7)"""
+        self._send_control({"op": 7, "d": None})
+
+    def invalidate_session(self):
+        """Tell the client its session cannot be resumed (op 9)"""
+        with self.cond:
+            self.session_id = None
+            self.history = []
+        self._send_control({"op": 9, "d": False})
+
+    def close(self, code: int):
+        """Close the connection with a close code (e.g. 4004 for a bad token)"""
+        with self.cond:
+            conn = self.conn
+        if conn is not None:
+            self._send_frame(conn, 0x8, struct.pack(">H", code))
+
+    def _send_control(self, payload: Dict):
+        with self.cond:
+            conn = self.conn
+        if conn is not None:
+            self._send_json(conn, payload)
+
+    def _send_json(self, conn: socket.socket, payload: Dict):
+        self._send_frame(conn, 0x1, json.dumps(payload).encode())
+
+    def _send_frame(self, conn: socket.socket, opcode: int, data: bytes):
+        if len(data) < 126:
+            header = struct.pack(">BB", 0x80 | opcode, len(data))
+        elif len(data) < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, len(data))
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, len(data))
+        try:
+            with self.send_lock:
+                conn.sendall(header + data)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("connection closed")
+            data += chunk
+        return data
+
+    def _recv_frame(self, conn: socket.socket) -> Tuple[int, bytes]:
+        first, second = self._recv_exact(conn, 2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._recv_exact(conn, 2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._recv_exact(conn, 8))[0]
+        mask = self._recv_exact(conn, 4) if second & 0x80 else b"\0\0\0\0"
+        data = self._recv_exact(conn, length)
+        return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        try:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            key = re.search(rb"(?i)sec-websocket-key:\s*(\S+)", request).group(1)
+            accept = base64.b64encode(hashlib.sha1(key + self.WEBSOCKET_GUID.encode()).digest()).decode()
+            conn.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode())
+
+            with self.cond:
+                self.conn = conn
+            self._send_json(conn, {"op": 10, "d": {"heartbeat_interval": self.heartbeat_interval_ms}})
+
+            while True:
+                opcode, data = self._recv_frame(conn)
+                if opcode == 0x8:
+                    return
+                if opcode != 0x1:
+                    continue
+                payload = json.loads(data)
+                op = payload.get("op")
+                with self.cond:
+                    self.received.append(op)
+                    self.cond.notify_all()
+
+                if op == 1:
+                    self._send_json(conn, {"op": 11})
+                elif op == 2:
+                    with self.cond:
+                        self.session_id = f"session-{self.sessions_started + 1}"
+                        ready = {"op": 0, "t": "READY", "s": 1, "d": {"session_id": self.session_id, "resume_gateway_url": self.url}}
+                        self.history = [ready]
+                    self._send_json(conn, ready)
+                    self._session_started()
+                elif op == 6:
+                    with self.cond:
+                        resumable = self.session_id is not None and payload["d"].get("session_id") == self.session_id
+                        missed = [event for event in self.history if event["s"] > (payload["d"].get("seq") or 0)]
+                    if not resumable:
+                        self._send_json(conn, {"op": 9, "d": False})
+                        continue
+                    for event in missed:
+                        self._send_json(conn, event)
+                    self._send_json(conn, {"op": 0, "t": "RESUMED", "s": None, "d": {}})
+                    self._session_started()
+        except (OSError, ConnectionError, ValueError):
+            return
+        finally:
+            with self.cond:
+                if self.conn is conn:
+                    self.conn = None
+            conn.close()
+
+    def _session_started(self):
+        with self.cond:
+            self.sessions_started += 1
+            self.cond.notify_all()
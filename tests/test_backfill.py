@@ -0,0 +1,34 @@
+import unittest
+from datetime import datetime, timezone
+
+from fakes import FakeDiscordAPI, FakeDiscordServer, make_reactor
+from discord_birthday_reactor import BackfillProgress, datetime_to_snowflake, parse_date_window, split_snowflake_range
+
+
+class BackfillTest(unittest.TestCase):
+    def test_segment_reaching_the_present_stays_open(self):
+        api = FakeDiscordAPI(guilds=1, channels_per_guild=1, dm_channels=0, messages_per_channel=48)
+        guild_id = api.guilds[0]["id"]
+        channel_id = api.channels[guild_id][0]["id"]
+        progress = BackfillProgress()
+
+        # The fake spreads messages over the whole day; keep only those already posted
+        started = datetime_to_snowflake(datetime.now(timezone.utc))
+        api.messages[channel_id] = [msg for msg in api.messages[channel_id] if int(msg["id"]) < started]
+
+        with FakeDiscordServer(api) as server:
+            reactor = make_reactor(self, base_url=server.base_url)
+            reactor.backfill(channel_links=[f"https://discord.com/channels/{guild_id}/{channel_id}"], date_filter="today", segments=4, concurrency=1, progress=progress)
+
+        lower, upper = parse_date_window("today")
+        for segment_lower, segment_upper in split_snowflake_range(lower, upper, 4):
+            if segment_upper <= started:
+                self.assertTrue(progress.is_done(channel_id, segment_lower, segment_upper))
+            elif segment_lower <= started:
+                # Messages posted later in this segment must be read next time
+                self.assertFalse(progress.is_done(channel_id, segment_lower, segment_upper))
+                self.assertLess(progress.get(channel_id, segment_lower, segment_upper), segment_upper - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
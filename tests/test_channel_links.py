@@ -0,0 +1,38 @@
+import unittest
+
+from fakes import FakeDiscordAPI, FakeDiscordServer, make_reactor
+from discord_birthday_reactor import CheckpointStore
+
+
+class OrderChannelLinksTest(unittest.TestCase):
+    def test_newest_activity_first(self):
+        checkpoints = CheckpointStore()
+        checkpoints.advance("stale", 700)
+        reactor = make_reactor(self, checkpoints=checkpoints, base_url="http://127.0.0.1:9")
+        reactor.metadata.set("channels:g", [
+            {"id": "quiet", "last_message_id": "100"},
+            {"id": "busy", "last_message_id": "900"},
+            {"id": "stale", "last_message_id": "200"},
+        ])
+        reactor.metadata.set("dm_channels", [{"id": "dm", "last_message_id": "500"}])
+
+        targets = [("g", "quiet"), ("@me", "dm"), ("g", "stale"), ("g", "unknown"), ("g", "busy")]
+        ordered = [channel_id for _, channel_id in reactor.order_channel_links(targets)]
+
+        # Never-scanned channels first, then by listing or checkpoint, whichever is newer
+        self.assertEqual(ordered, ["unknown", "busy", "stale", "dm", "quiet"])
+
+    def test_links_are_ordered_only_with_a_time_budget(self):
+        api = FakeDiscordAPI(guilds=1, channels_per_guild=2, dm_channels=0, messages_per_channel=10)
+        links = [f"https://discord.com/channels/{guild_id}/{channel['id']}" for guild_id, channels in api.channels.items() for channel in channels]
+        with FakeDiscordServer(api) as server:
+            reactor = make_reactor(self, base_url=server.base_url)
+            reactor.run(channel_links=links, date_filter="today")
+            self.assertEqual(api.requests["GET /guilds/{id}/channels"], 0)
+
+            reactor.run(channel_links=links, date_filter="today", time_budget=60)
+            self.assertEqual(api.requests["GET /guilds/{id}/channels"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
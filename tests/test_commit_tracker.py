@@ -0,0 +1,54 @@
+import unittest
+
+from discord_birthday_reactor import CheckpointStore, CommitTracker
+
+
+class CommitTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.advanced = []
+        self.tracker = CommitTracker(self.advanced.append)
+
+    def test_advances_to_read_cursor_without_reactions(self):
+        self.tracker.read_up_to(100)
+        self.assertEqual(self.advanced, [100])
+
+    def test_waits_for_held_messages(self):
+        self.tracker.hold("50")
+        self.tracker.read_up_to(100)
+        self.assertEqual(self.advanced, [49])
+        self.tracker.release("50", True)
+        self.assertEqual(self.advanced, [49, 100])
+
+    def test_stops_before_failed_message(self):
+        self.tracker.hold("50")
+        self.tracker.hold("70")
+        self.tracker.read_up_to(100)
+        self.tracker.release("50", True)
+        self.tracker.release("70", False)
+        self.assertEqual(self.advanced[-1], 69)
+
+        # A later successful attempt clears the failure
+        self.tracker.hold("70")
+        self.tracker.release("70", True)
+        self.assertEqual(self.advanced[-1], 100)
+
+    def test_message_in_flight_is_not_held_twice(self):
+        self.assertTrue(self.tracker.hold("50"))
+        self.assertFalse(self.tracker.hold("50"))
+
+
+class CheckpointStoreTest(unittest.TestCase):
+    def test_commit_waits_for_queued_reactions(self):
+        store = CheckpointStore()
+        tracker = store.tracker("c")
+        store.stage("c", 100)
+        tracker.hold("60")
+        store.commit("c")
+        self.assertEqual(store.get("c"), 59)
+        self.assertEqual(store.latest("c"), 100)
+        tracker.release("60", True)
+        self.assertEqual(store.get("c"), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fakes import FakeDiscordAPI, FakeDiscordServer, make_reactor
+from discord_birthday_reactor import PollScheduler, datetime_to_snowflake
+
+
+class RefreshPollTargetsTest(unittest.TestCase):
+    def test_channels_idle_in_window_stay_backed_off(self):
+        # Channels whose newest message is from two days ago have nothing for "today"
+        api = FakeDiscordAPI(guilds=1, channels_per_guild=3, dm_channels=1, messages_per_channel=10)
+        dormant = str(datetime_to_snowflake(datetime.now(timezone.utc) - timedelta(days=2)))
+        for channel in api.channels[api.guilds[0]["id"]] + api.dm_channels:
+            channel["last_message_id"] = dormant
+        schedule = PollScheduler(min_interval=30, max_interval=1800)
+
+        with FakeDiscordServer(api) as server:
+            reactor = make_reactor(self, base_url=server.base_url)
+            reactor.refresh_poll_targets(schedule, date_filter="today")
+            self.assertEqual(set(schedule.intervals.values()), {1800})
+
+            for channel_id in list(schedule.intervals):
+                schedule.record(channel_id, new_messages=False, matches=0)
+            reactor.refresh_poll_targets(schedule, date_filter="today")
+            self.assertEqual(set(schedule.intervals.values()), {1800})
+
+            # Without a window the same channels have unscanned messages
+            reactor.refresh_poll_targets(schedule)
+            self.assertEqual(set(schedule.intervals.values()), {30})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fakes import USER_ID, FakeDiscordAPI, FakeDiscordGateway, FakeDiscordServer, make_reactor
+from discord_birthday_reactor import GatewayClient, ReactionRule, datetime_to_snowflake
+
+
+def wait_until(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class ListenTest(unittest.TestCase):
+    """Drives listen mode against the fake gateway and fake REST API"""
+
+    def setUp(self):
+        self.api = FakeDiscordAPI(guilds=1, channels_per_guild=1, dm_channels=0, messages_per_channel=1, match_rate=0.0)
+        self.guild_id = self.api.guilds[0]["id"]
+        self.channel_id = self.api.channels[self.guild_id][0]["id"]
+
+    def post(self, gateway: FakeDiscordGateway, content: str, mention: bool, message_id: int = None):
+        """Add a message to the fake API and announce it over the gateway"""
+        last = self.api.messages[self.channel_id][-1]
+        message = dict(
+            last,
+            id=str(message_id or int(last["id"]) + 1),
+            content=content,
+            mentions=[{"id": USER_ID, "username": "me"}] if mention else [],
+            reactions=[],
+        )
+        self.api.messages[self.channel_id].append(message)
+        gateway.dispatch("MESSAGE_CREATE", message)
+
+    def test_session_lifecycle(self):
+        with FakeDiscordServer(self.api) as server, FakeDiscordGateway(heartbeat_interval_ms=100) as gateway:
+            reactor = make_reactor(self, reaction_emojis=["❤️"], base_url=server.base_url)
+            listener = threading.Thread(
+                target=reactor.listen,
+                kwargs={"keywords": ["birthday"], "gateway_url": gateway.url, "reconnect_delay": 0.05},
+                daemon=True,
+            )
+            listener.start()
+
+            # IDENTIFY -> READY, then a match and a message that does not match
+            self.assertTrue(gateway.wait_for_session(1))
+            self.post(gateway, "happy birthday!", mention=True)
+            self.post(gateway, "happy birthday to someone else", mention=False)
+            self.assertTrue(wait_until(lambda: self.api.reactions == 1))
+
+            # Heartbeats are sent and acknowledged
+            self.assertTrue(wait_until(lambda: gateway.received.count(GatewayClient.OP_HEARTBEAT) >= 2))
+
+            # RECONNECT -> RESUME, with the event sent while away replayed
+            gateway.reconnect()
+            self.post(gateway, "belated birthday wishes", mention=True)
+            self.assertTrue(gateway.wait_for_session(2))
+            self.assertIn(GatewayClient.OP_RESUME, gateway.received)
+            self.assertTrue(wait_until(lambda: self.api.reactions == 2))
+
+            # INVALID_SESSION -> a fresh IDENTIFY
+            gateway.invalidate_session()
+            self.assertTrue(gateway.wait_for_session(3))
+            self.assertEqual(gateway.received.count(GatewayClient.OP_IDENTIFY), 2)
+            self.post(gateway, "birthday cake time", mention=True)
+            self.assertTrue(wait_until(lambda: self.api.reactions == 3))
+
+            # A fatal close code ends listen mode
+            gateway.close(4004)
+            listener.join(timeout=10)
+            self.assertFalse(listener.is_alive())
+
+        counters = reactor.metrics.summary()["counters"]
+        self.assertEqual(counters.get("matches"), 3)
+        self.assertEqual(counters.get("reactions_added"), 3)
+
+    def test_today_rule_follows_the_date(self):
+        class Tomorrow(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.now(tz) + timedelta(days=1)
+
+        with FakeDiscordServer(self.api) as server, FakeDiscordGateway(heartbeat_interval_ms=100) as gateway:
+            reactor = make_reactor(self, rules=[ReactionRule("today", ["birthday"], ["❤️"], date_filter="today")], base_url=server.base_url)
+            listener = threading.Thread(
+                target=reactor.listen,
+                kwargs={"gateway_url": gateway.url, "reconnect_delay": 0.05},
+                daemon=True,
+            )
+            listener.start()
+            self.assertTrue(gateway.wait_for_session(1))
+
+            # After midnight UTC the rule covers the new day
+            with mock.patch("discord_birthday_reactor.datetime", Tomorrow):
+                message_id = datetime_to_snowflake(Tomorrow.now(timezone.utc))
+                self.post(gateway, "happy birthday!", mention=True, message_id=message_id)
+                self.assertTrue(wait_until(lambda: self.api.reactions == 1))
+
+            gateway.close(4004)
+            listener.join(timeout=10)
+            self.assertFalse(listener.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import io
+import json
+import unittest
+
+from discord_birthday_reactor import log, setup_logging
+
+
+class SetupLoggingTest(unittest.TestCase):
+    def setUp(self):
+        handlers, level, propagate = log.handlers[:], log.level, log.propagate
+
+        def restore():
+            log.handlers, log.level, log.propagate = handlers, level, propagate
+
+        self.addCleanup(restore)
+
+    def log_exception(self, fmt: str) -> str:
+        stream = io.StringIO()
+        listener = setup_logging("INFO", fmt, stream=stream)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.exception("✗ Failed on %s", "channel", extra={"channel_id": "c"})
+        finally:
+            listener.stop()
+        return stream.getvalue()
+
+    def test_console_keeps_traceback(self):
+        output = self.log_exception("console")
+        self.assertIn("✗ Failed on channel", output)
+        self.assertIn("Traceback", output)
+        self.assertIn("ValueError: boom", output)
+
+    def test_json_keeps_exc_field(self):
+        entry = json.loads(self.log_exception("json"))
+        self.assertEqual(entry["msg"], "✗ Failed on channel")
+        self.assertEqual(entry["channel_id"], "c")
+        self.assertIn("ValueError: boom", entry["exc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
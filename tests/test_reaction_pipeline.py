@@ -0,0 +1,45 @@
+import threading
+import unittest
+
+from discord_birthday_reactor import Emoji, ReactionPipeline, ReactionWork
+
+
+class ReactionPipelineTest(unittest.TestCase):
+    def run_pipeline(self, workers: int, queue_size: int, channels: int, messages: int):
+        done = []
+        lock = threading.Lock()
+
+        def react(channel_id, message_id, emoji):
+            with lock:
+                done.append((channel_id, message_id, emoji.text))
+            return True
+
+        pipeline = ReactionPipeline(react, workers=workers, channel_queue_size=queue_size, delay_min=0.0, delay_max=0.0)
+        pipeline.start()
+        emojis = [Emoji("❤️"), Emoji("🚀")]
+        for i in range(messages):
+            pipeline.submit(ReactionWork(f"c{i % channels}", f"m{i}", emojis))
+
+        finished = threading.Thread(target=pipeline.close, daemon=True)
+        finished.start()
+        finished.join(timeout=10)
+        self.assertFalse(finished.is_alive(), f"pipeline hung with {pipeline.pending} reaction(s) pending")
+        self.assertEqual(pipeline.pending, 0)
+        self.assertEqual(len(done), messages * len(emojis))
+
+    def test_single_worker_small_queue(self):
+        self.run_pipeline(workers=1, queue_size=1, channels=1, messages=20)
+
+    def test_submitter_waiting_while_queue_drains(self):
+        # A submitter blocked on a full queue must not append to the deque a
+        # worker removed when it ran empty
+        self.run_pipeline(workers=4, queue_size=2, channels=3, messages=3000)
+
+    def test_non_blocking_submit_reports_full_queue(self):
+        pipeline = ReactionPipeline(lambda *args: True, workers=1, channel_queue_size=1)
+        self.assertTrue(pipeline.submit(ReactionWork("c", "m1", [Emoji("❤️")]), block=False))
+        self.assertFalse(pipeline.submit(ReactionWork("c", "m2", [Emoji("❤️")]), block=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from fakes import FakeDiscordAPI, FakeDiscordServer, make_reactor
+
+
+class RejectedReactionTest(unittest.TestCase):
+    """A reaction Discord refuses for good must not hold the checkpoint back"""
+
+    def test_forbidden_message_is_not_retried(self):
+        api = FakeDiscordAPI(guilds=1, channels_per_guild=1, dm_channels=0, messages_per_channel=100, match_rate=0.1)
+        guild_id = api.guilds[0]["id"]
+        channel_id = api.channels[guild_id][0]["id"]
+        matches = [msg for msg in api.messages[channel_id] if msg["mentions"]]
+        api.forbidden.add(matches[0]["id"])
+        link = f"https://discord.com/channels/{guild_id}/{channel_id}"
+
+        with FakeDiscordServer(api) as server:
+            reactor = make_reactor(self, reaction_emojis=["❤️"], base_url=server.base_url)
+            reactor.run(channel_links=[link], date_filter="today")
+            self.assertEqual(reactor.checkpoints.get(channel_id), int(api.messages[channel_id][-1]["id"]))
+            self.assertEqual(reactor.metrics.summary()["counters"].get("reactions_rejected"), 1)
+
+            puts = api.requests["PUT /channels/{id}/messages/{id}/reactions"]
+            reactor.run(channel_links=[link], date_filter="today")
+            self.assertEqual(api.requests["PUT /channels/{id}/messages/{id}/reactions"], puts)
+
+
+if __name__ == "__main__":
+    unittest.main()
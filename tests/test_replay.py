@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fakes import FakeDiscordAPI, FakeDiscordServer, make_reactor
+from discord_birthday_reactor import HTTPTransport, RecordingTransport, ReplayTransport, parse_date_window
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cassette = os.path.join(self.tmp.name, "run.jsonl")
+
+    def test_today_resolves_against_pinned_time(self):
+        now = datetime(2025, 11, 11, 18, 30, tzinfo=timezone.utc)
+        self.assertEqual(parse_date_window("today", now=now), parse_date_window("2025-11-11"))
+
+    def test_replay_uses_recorded_window(self):
+        api = FakeDiscordAPI(guilds=1, channels_per_guild=2, dm_channels=0, messages_per_channel=50)
+        links = [f"https://discord.com/channels/{guild_id}/{channel['id']}" for guild_id, channels in api.channels.items() for channel in channels]
+        with FakeDiscordServer(api) as server:
+            base_url = server.base_url
+            recorder = RecordingTransport(HTTPTransport(), self.cassette, token="test-token")
+            make_reactor(self, reaction_emojis=["❤️"], transport=recorder, base_url=base_url).run(channel_links=links, date_filter="today")
+            recorder.close()
+        self.assertGreater(api.reactions, 0)
+
+        replay = ReplayTransport(self.cassette, pacing="fast")
+        self.assertIsNotNone(replay.recorded_at)
+
+        # Replayed the next day, "today" would ask for a window the cassette lacks
+        tomorrow = ReplayTransport(self.cassette, pacing="fast")
+        make_reactor(self, reaction_emojis=["❤️"], transport=tomorrow, base_url=base_url, now=tomorrow.recorded_at + timedelta(days=1)).run(channel_links=links, date_filter="today")
+        self.assertGreater(tomorrow.misses, 0)
+
+        # Pinned to the recording time it requests exactly what was recorded
+        reactor = make_reactor(self, reaction_emojis=["❤️"], transport=replay, base_url=base_url, now=replay.recorded_at)
+        reactor.run(channel_links=links, date_filter="today")
+        self.assertEqual(replay.misses, 0)
+        self.assertEqual(reactor.metrics.summary()["counters"].get("reactions_added"), api.reactions)
+
+    def test_fast_pacing_skips_recorded_rate_limits(self):
+        url = "http://127.0.0.1:1/api/v10/channels/1/messages"
+        exchange = {"elapsed": 0.5, "method": "GET", "url": url, "params": {"limit": 100}, "json": None}
+        limited = {"Content-Type": "application/json", "X-RateLimit-Bucket": "b", "X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "2.0"}
+        with open(self.cassette, "w", encoding="utf-8") as f:
+            for status, headers, body in (
+                (200, limited, "[]"),
+                (429, dict(limited, **{"Retry-After": "2"}), '{"message": "You are being rate limited.", "retry_after": 2.0, "global": false}'),
+                (200, limited, "[]"),
+            ):
+                f.write(json.dumps(dict(exchange, status=status, headers=headers, body=body)) + "\n")
+
+        reactor = make_reactor(self, transport=ReplayTransport(self.cassette, pacing="fast"), base_url="http://127.0.0.1:1/api/v10")
+        started = time.monotonic()
+        for _ in range(2):
+            self.assertEqual(reactor._request("GET", "/channels/1/messages", params={"limit": 100}).status_code, 200)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
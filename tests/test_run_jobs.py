@@ -0,0 +1,44 @@
+import asyncio
+import time
+import unittest
+
+from fakes import make_reactor
+from discord_birthday_reactor import DeadlineExceeded
+
+
+class RunJobsTest(unittest.TestCase):
+    def make_jobs(self, ran):
+        def fails():
+            raise ValueError("boom")
+
+        def cut_off():
+            raise DeadlineExceeded("GET /channels/1/messages")
+
+        return [lambda: ran.append("a"), fails, cut_off, lambda: ran.append("b")]
+
+    def test_sequential_and_concurrent_handle_errors_alike(self):
+        for concurrency in (1, 3):
+            with self.subTest(concurrency=concurrency):
+                reactor = make_reactor(self)
+                ran = []
+                jobs = self.make_jobs(ran)
+                if concurrency == 1:
+                    for job in jobs:
+                        reactor.run_job(job)
+                else:
+                    asyncio.run(reactor.run_jobs(jobs, concurrency))
+                self.assertEqual(sorted(ran), ["a", "b"])
+                self.assertEqual(reactor.metrics.summary()["counters"].get("jobs_unfinished"), 1)
+
+    def test_jobs_are_not_started_after_the_deadline(self):
+        reactor = make_reactor(self)
+        reactor.deadline = time.monotonic() + 0.1
+        ran = []
+        jobs = [lambda: time.sleep(0.2)] + [lambda: ran.append(1)] * 5
+        asyncio.run(reactor.run_jobs(jobs, 1))
+        self.assertEqual(ran, [])
+        self.assertEqual(reactor.metrics.summary()["counters"].get("jobs_unfinished"), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
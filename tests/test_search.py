@@ -0,0 +1,35 @@
+import unittest
+
+from fakes import SEARCH_PAGE_SIZE, FakeDiscordAPI, FakeDiscordServer, make_reactor
+
+SEARCH_ROUTE = "GET /guilds/{id}/messages/search"
+
+
+class GuildSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeDiscordAPI(guilds=1, channels_per_guild=2, dm_channels=0, messages_per_channel=200, match_rate=0.5)
+        self.guild_id = self.api.guilds[0]["id"]
+        self.hits = sum(1 for messages in self.api.messages.values() for msg in messages if msg["mentions"])
+        self.assertGreater(self.hits, SEARCH_PAGE_SIZE)
+
+    def search(self, reactor):
+        return reactor.search_messages_in_guild(self.guild_id, keywords=["birthday"])
+
+    def test_without_window_only_newest_page_is_read(self):
+        with FakeDiscordServer(self.api) as server:
+            reactor = make_reactor(self, base_url=server.base_url)
+            messages = self.search(reactor)
+            self.assertEqual(self.api.requests[SEARCH_ROUTE], 1)
+            self.assertEqual(len(messages), SEARCH_PAGE_SIZE)
+
+    def test_context_messages_are_not_hits(self):
+        self.api.search_context = True
+        with FakeDiscordServer(self.api) as server:
+            reactor = make_reactor(self, base_url=server.base_url)
+            messages = self.search(reactor)
+        self.assertEqual(len(messages), SEARCH_PAGE_SIZE)
+        self.assertTrue(all("birthday" in msg.content for msg in messages))
+
+
+if __name__ == "__main__":
+    unittest.main()